@@ -1,15 +1,14 @@
 from langgraph.graph import MessagesState, START, END, StateGraph
-from langchain_core.messages import SystemMessage
-from ChatBot.llm import get_llm
+from langchain_core.messages import SystemMessage, HumanMessage
+from ChatBot.llm import get_llm, get_summary_llm
+from ChatBot.context import InterviewState, build_prompt, turns_to_summarize, format_turns, SUMMARY_BATCH_TURNS
 from langgraph.checkpoint.memory import MemorySaver
-from langgraph.checkpoint.mongodb import MongoDBSaver
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from mongodb.checkpointer import get_checkpointer
 from ChatBot.tools.tool_list import tool_list
 from langgraph.prebuilt import ToolNode, tools_condition
-import os
-from typing import List
-from dotenv import load_dotenv
-load_dotenv()
+import asyncio
+from typing import Dict, List
 
 
 sys_msg = SystemMessage(content="""
@@ -31,20 +30,76 @@ sys_msg = SystemMessage(content="""
                         
 """)                
 
-llm = get_llm()
+# Built by get_agent (inside lifespan) rather than at import
+llm = None
 # https://www.google.com/imgres?q=crop%20image&imgurl=https%3A%2F%2Fimages.unsplash.com%2Fphoto-1511735643442-503bb3bd348a%3Ffm%3Djpg%26q%3D60%26w%3D3000%26ixlib%3Drb-4.1.0%26ixid%3DM3wxMjA3fDB8MHxzZWFyY2h8M3x8Y3JvcHxlbnwwfHwwfHx8MA%253D%253D&imgrefurl=https%3A%2F%2Funsplash.com%2Fs%2Fphotos%2Fcrop&docid=tre2ZSeL_ojY0M&tbnid=_EBeTTzQNmepuM&vet=12ahUKEwiy7fnKj86PAxWdZmwGHZOJGPEQM3oECB0QAA..i&w=3000&h=1688&hcb=2&ved=2ahUKEwiy7fnKj86PAxWdZmwGHZOJGPEQM3oECB0QAA
 
-def assistant(state:MessagesState):
-    return {"messages":[llm.invoke([sys_msg] + state["messages"])]}
+summary_llm = None
 
+# Background summaries by thread id, each thread's next turn waits for its own
+_summary_tasks: Dict[str, asyncio.Task] = {}
 
-def get_agent(extra_tools: List = []):
-    graph = StateGraph(MessagesState)
+async def summarize_history(agent, config: dict):
+    """
+    Fold turns that left the context window into the running summary, a batch at a time.
+    Runs after a turn instead of before the assistant, so the reply never waits on
+    the summary LLM; the next turn's prompt picks the result up.
+    """
+    state = (await agent.aget_state(config)).values
+    pending, until = turns_to_summarize(state)
+    if len(pending) < SUMMARY_BATCH_TURNS:
+        return
+    prompt = [
+        SystemMessage(content="You maintain notes for a technical interview. Update the summary with the new exchange. "
+                              "Keep the questions asked, how the candidate answered each, scores or feedback given, "
+                              "how many questions remain and any code the candidate submitted (described, not copied). "
+                              "Reply with the updated summary only, at most 200 words."),
+        HumanMessage(content=f"Current summary:\n{state.get('summary') or '(none)'}\n\nNew exchange:\n{format_turns(pending)}"),
+    ]
+    summary = await summary_llm.ainvoke(prompt)
+    await agent.aupdate_state(config, {"summary": summary.content, "summary_until": until}, as_node="assistant")
+    print(f"DEBUG: 🗜️ Summarized {len(pending)} turns")
+
+def schedule_summary(agent, config: dict):
+    """
+    Start summarize_history for a finished turn without waiting for it.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    task = asyncio.create_task(summarize_history(agent, config))
+    _summary_tasks[thread_id] = task
+
+    def done(task: asyncio.Task):
+        if _summary_tasks.get(thread_id) is task:
+            del _summary_tasks[thread_id]
+        if not task.cancelled() and task.exception() is not None:
+            # The turns stay unsummarized and are retried after the next turn
+            print(f"DEBUG: ⚠️ Summary failed for {thread_id}: {task.exception()}")
+    task.add_done_callback(done)
+
+async def wait_for_summary(config: dict):
+    """
+    Called before a turn writes to the thread, so the summary's state update
+    and the turn's checkpoints don't overwrite each other.
+    """
+    task = _summary_tasks.get(config["configurable"]["thread_id"])
+    if task is not None:
+        await asyncio.wait({task})
+
+def assistant(state:InterviewState):
+    return {"messages":[llm.invoke(build_prompt(sys_msg, state))]}
+
+
+def get_agent(extra_tools: List = [], mongodb_client: AsyncIOMotorClient | None = None):
+    global llm, summary_llm
+    if llm is None:
+        llm = get_llm()
+    if summary_llm is None:
+        summary_llm = get_summary_llm()
+    graph = StateGraph(InterviewState)
     graph.add_node("assistant",assistant)
     graph.add_node("tools",ToolNode(tool_list + extra_tools))
     graph.add_edge(START,"assistant")
     graph.add_conditional_edges("assistant",tools_condition)
     graph.add_edge("tools","assistant")
-    client = MongoClient(os.getenv("MONGODB_URL"))
-    checkpointer = MongoDBSaver(client)
+    checkpointer = get_checkpointer(mongodb_client)
     return graph.compile(checkpointer=checkpointer)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import os
+import struct
+from dataclasses import dataclass, replace
+from typing import Iterator
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    name: str
+    encoding: str  # AudioEncoding member name (texttospeech for output, speech.RecognitionConfig for input)
+    sample_rate: int
+    # 0 sends each sentence as one message (a complete, independently decodable file)
+    chunk_bytes: int = 0
+
+
+# What a client can ask for in its config message ({"type": "config", "audio_format": "ogg_opus"})
+AUDIO_FORMATS = {
+    # Raw LINEAR16 @ 24 kHz, ~384 kbit/s, sliced into ~170 ms messages
+    "pcm": AudioFormat("pcm", "LINEAR16", 24000, chunk_bytes=8192),
+    # Ogg Opus, ~10x smaller. One Ogg file per sentence so the browser can decodeAudioData() each as it lands
+    "ogg_opus": AudioFormat("ogg_opus", "OGG_OPUS", 24000),
+}
+DEFAULT_AUDIO_FORMAT = os.getenv("TTS_DEFAULT_AUDIO_FORMAT", "pcm")
+
+# What the client sends ({"type": "config", "audio_input": "pcm", "sample_rate": 16000}), before the first frame
+AUDIO_INPUT_FORMATS = {
+    # MediaRecorder output, the first chunk is the WebM header
+    "webm_opus": AudioFormat("webm_opus", "WEBM_OPUS", 48000),
+    # Raw mono LINEAR16, lets the server run VAD (see ChatBot/vad.py) before STT
+    "pcm": AudioFormat("pcm", "LINEAR16", 16000),
+}
+PCM_INPUT_SAMPLE_RATES = (8000, 16000, 24000, 48000)
+
+OPUS_GRANULE_RATE = 48000  # Ogg Opus granule positions always count 48 kHz samples
+
+
+class AudioOutput:
+    """
+    Output format of one voice socket. Changed by the config message, read by
+    tts_stream for every sentence it synthesizes.
+    """
+    def __init__(self, name: str = DEFAULT_AUDIO_FORMAT):
+        self.format = AUDIO_FORMATS.get(name, AUDIO_FORMATS["pcm"])
+
+    def select(self, name: str) -> bool:
+        if name not in AUDIO_FORMATS:
+            return False
+        self.format = AUDIO_FORMATS[name]
+        return True
+
+    def describe(self) -> dict:
+        return {"type": "audio_format", "format": self.format.name, "sample_rate": self.format.sample_rate}
+
+
+class AudioInput:
+    """
+    Input format of one voice socket. Fixed once the first audio frame arrives
+    (select() refuses after that); stt_stream reads it when that frame reaches
+    it, which is also when it picks its rotation strategy.
+    """
+    def __init__(self):
+        self.format = AUDIO_INPUT_FORMATS["webm_opus"]
+        self.started = False
+
+    def select(self, name: str, sample_rate: int | None = None) -> bool:
+        if self.started or name not in AUDIO_INPUT_FORMATS:
+            return False
+        audio_format = AUDIO_INPUT_FORMATS[name]
+        if sample_rate is not None and audio_format.encoding == "LINEAR16":
+            if sample_rate not in PCM_INPUT_SAMPLE_RATES:
+                return False
+            audio_format = replace(audio_format, sample_rate=sample_rate)
+        self.format = audio_format
+        return True
+
+    def describe(self) -> dict:
+        return {"type": "audio_input", "format": self.format.name, "sample_rate": self.format.sample_rate}
+
+
+def split_audio(audio_format: AudioFormat, audio: bytes) -> Iterator[bytes | memoryview]:
+    if not audio_format.chunk_bytes:
+        yield audio
+        return
+    # Slices of a memoryview share the buffer, nothing is copied until the socket writes it
+    view = memoryview(audio)
+    for i in range(0, len(view), audio_format.chunk_bytes):
+        yield view[i : i + audio_format.chunk_bytes]
+
+
+def playback_seconds(audio_format: AudioFormat, audio: bytes | memoryview) -> float:
+    """
+    How long the client will be playing `audio` (used by barge-in).
+    """
+    if audio_format.encoding == "OGG_OPUS":
+        return ogg_opus_seconds(audio)
+    return len(audio) / (audio_format.sample_rate * 2)
+
+
+def ogg_opus_seconds(audio: bytes) -> float:
+    # Granule position of the last page, minus the pre-skip from the OpusHead packet
+    last_page = audio.rfind(b"OggS")
+    head = audio.find(b"OpusHead")
+    if last_page < 0 or len(audio) < last_page + 14:
+        return 0.0
+    granule = struct.unpack_from("<q", audio, last_page + 6)[0]
+    pre_skip = struct.unpack_from("<H", audio, head + 10)[0] if 0 <= head <= len(audio) - 12 else 0
+    return max(0, granule - pre_skip) / OPUS_GRANULE_RATE
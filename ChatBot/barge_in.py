@@ -0,0 +1,101 @@
+import os
+import time
+import asyncio
+from typing import List, Optional
+from ChatBot.events import VoiceAgentEvent
+
+BARGE_IN_ENABLED = os.getenv("BARGE_IN_ENABLED", "false").lower() == "true"
+# Interim transcript must have at least this many words to count as the candidate talking
+BARGE_IN_MIN_WORDS = int(os.getenv("BARGE_IN_MIN_WORDS", "2"))
+
+
+class BargeIn:
+    """
+    Per-socket interruption state shared by the STT, agent and TTS stages.
+
+    Every agent reply is a "turn" with its own cancel token (an asyncio.Event).
+    Stages capture the token when they start work for the turn, register tasks
+    that must die with it, and check token.is_set() before emitting anything.
+    """
+    def __init__(self, enabled: bool = BARGE_IN_ENABLED, min_words: int = BARGE_IN_MIN_WORDS):
+        self.enabled = enabled
+        self.min_words = min_words
+        self.cancelled: Optional[asyncio.Event] = None
+        self.generating = False
+        self.pending_sentences = 0
+        self.playing_until = 0.0
+        # [text, start, end] of each sentence of the turn on the playback clock (time.monotonic)
+        self.sentences = []
+        self.interrupted_at: Optional[float] = None
+        self._tasks = set()
+
+    def start_turn(self) -> asyncio.Event:
+        self.cancelled = asyncio.Event()
+        self.generating = True
+        self.sentences = []
+        self.interrupted_at = None
+        self._tasks = set()
+        return self.cancelled
+
+    def register(self, token: asyncio.Event, task: asyncio.Task):
+        """Cancel `task` if the turn owning `token` gets interrupted."""
+        if token is not self.cancelled or token.is_set():
+            task.cancel()
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def is_speaking(self) -> bool:
+        if self.cancelled is None or self.cancelled.is_set():
+            return False
+        return self.generating or self.pending_sentences > 0 or time.monotonic() < self.playing_until
+
+    def should_interrupt(self, event: VoiceAgentEvent) -> bool:
+        if not self.enabled or event.type != "stt_output" or not event.text:
+            return False
+        return len(event.text.split()) >= self.min_words and self.is_speaking()
+
+    def interrupt(self):
+        print("DEBUG: ✋ Barge-in, cancelling current reply")
+        self.interrupted_at = time.monotonic()
+        self.cancelled.set()
+        self.generating = False
+        self.playing_until = 0.0
+        for task in list(self._tasks):
+            task.cancel()
+
+    def sentence_sent(self, token: asyncio.Event, text: str, seconds: float):
+        """
+        Called by TTS before a sentence's audio goes out: it plays after what is
+        already queued on the client, for `seconds`.
+        """
+        if token is not self.cancelled:
+            return
+        start = max(self.playing_until, time.monotonic())
+        self.sentences.append([text, start, start + seconds])
+
+    def heard(self, token: asyncio.Event) -> Optional[List[str]]:
+        """
+        What the candidate heard of the turn owning `token` before cutting in:
+        whole sentences that finished playing, then the words of the one playing
+        at that moment in proportion to its elapsed time. None if the turn wasn't
+        interrupted. Only valid until the next start_turn().
+        """
+        if token is not self.cancelled or self.interrupted_at is None:
+            return None
+        heard = []
+        for text, start, end in self.sentences:
+            if end <= self.interrupted_at:
+                heard.append(text)
+                continue
+            if start < self.interrupted_at:
+                words = text.split()
+                played = int(len(words) * (self.interrupted_at - start) / (end - start))
+                if played:
+                    heard.append(" ".join(words[:played]) + "...")
+            break
+        return heard
+
+    def audio_sent(self, seconds: float):
+        # Estimate of how long the browser keeps playing what was sent
+        self.playing_until = max(self.playing_until, time.monotonic()) + seconds
@@ -0,0 +1,211 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+from Utils.lazy import lazy_import
+from Utils.metrics import increment, observe
+
+speech = lazy_import("google.cloud.speech")
+texttospeech = lazy_import("google.cloud.texttospeech")
+api_exceptions = lazy_import("google.api_core.exceptions")
+
+# Health checks also keep idle connections open, so keep this under the keepalive windows below
+CLIENT_HEALTH_INTERVAL = float(os.getenv("CLIENT_HEALTH_INTERVAL_SECONDS", "60"))
+CLIENT_CHECK_TIMEOUT = float(os.getenv("CLIENT_CHECK_TIMEOUT_SECONDS", "10"))
+# Consecutive failed checks before a client is replaced with a fresh one
+CLIENT_MAX_FAILURES = int(os.getenv("CLIENT_MAX_FAILURES", "3"))
+GROQ_KEEPALIVE_SECONDS = float(os.getenv("GROQ_KEEPALIVE_SECONDS", "120"))
+GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com")
+# gRPC pings while a call is open, so a dead connection under a long STT stream is noticed
+GRPC_KEEPALIVE_OPTIONS = [
+    ("grpc.keepalive_time_ms", int(float(os.getenv("GRPC_KEEPALIVE_SECONDS", "60")) * 1000)),
+    ("grpc.keepalive_timeout_ms", 10000),
+]
+
+
+class ClientRegistry:
+    """
+    API clients shared by every session of a worker.
+
+    Each client is created on first acquire() (or by warm() in lifespan),
+    checked every CLIENT_HEALTH_INTERVAL and replaced after CLIENT_MAX_FAILURES
+    failed checks. The replaced client is closed, so sessions must not hold on
+    to a client: they acquire() it for every stream or request, and the call
+    that hit the closed channel fails like any other API error.
+    """
+    def __init__(self):
+        self.factories: Dict[str, tuple] = {}
+        self.clients: Dict[str, Any] = {}
+        self.health: Dict[str, dict] = {}
+        self._failures: Dict[str, int] = {}
+
+    def register(
+        self, name: str,
+        create: Callable[[], Any],
+        check: Callable[[Any], Awaitable[None]],
+        close: Optional[Callable[[Any], Awaitable[None]]] = None,
+        replace: bool = True,
+        prepare: Optional[Callable[[], Any]] = None,
+    ):
+        # replace=False for clients captured at startup (the Groq pool lives inside the agent's models).
+        # prepare is blocking setup (credentials) that acquire() runs in a thread before create
+        self.factories[name] = (create, check, close, replace, prepare)
+
+    def get(self, name: str) -> Any:
+        """
+        Sync access for clients without a prepare step (the Groq pool, built in get_agent).
+        """
+        client = self.clients.get(name)
+        if client is None:
+            if self.factories[name][4] is not None:
+                raise RuntimeError(f"{name} client needs acquire()")
+            client = self._create(name)
+        return client
+
+    async def acquire(self, name: str) -> Any:
+        client = self.clients.get(name)
+        if client is None:
+            prepare = self.factories[name][4]
+            if prepare is not None:
+                await asyncio.to_thread(prepare)
+            # Another caller may have created it while we waited
+            client = self.clients.get(name) or self._create(name)
+        return client
+
+    def _create(self, name: str) -> Any:
+        started = time.perf_counter()
+        client = self.factories[name][0]()
+        observe(f"clients.{name}.create_s", time.perf_counter() - started)
+        self.clients[name] = client
+        return client
+
+    async def check(self, name: str) -> bool:
+        _, check, close, replace, _ = self.factories[name]
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(await self.acquire(name)), CLIENT_CHECK_TIMEOUT)
+            error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - started
+        observe(f"clients.{name}.check_s", elapsed)
+        self.health[name] = {"healthy": error is None, "checked_at": time.time(), "latency_s": round(elapsed, 6), "error": error}
+
+        if error is None:
+            self._failures[name] = 0
+            return True
+        increment(f"clients.{name}.unhealthy")
+        self._failures[name] = self._failures.get(name, 0) + 1
+        print(f"DEBUG: ⚠️ {name} client check failed ({self._failures[name]} in a row): {error}")
+        if replace and self._failures[name] >= CLIENT_MAX_FAILURES:
+            print(f"DEBUG: 🔁 Replacing {name} client")
+            increment(f"clients.{name}.replaced")
+            old = self.clients.pop(name, None)
+            self._failures[name] = 0
+            if old is not None and close is not None:
+                await self._close(name, old, close)
+        return False
+
+    async def warm(self):
+        """
+        Create every client and run its check once, so the first session
+        doesn't pay for DNS, TLS, HTTP/2 setup and the auth token.
+        """
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.check(name) for name in self.factories))
+        ready = [name for name, ok in zip(self.factories, results) if ok]
+        print(f"INFO: Warmed clients {ready} of {list(self.factories)} in {time.perf_counter() - started:.2f}s")
+
+    async def run_health_checks(self):
+        while True:
+            await asyncio.sleep(CLIENT_HEALTH_INTERVAL)
+            await asyncio.gather(*(self.check(name) for name in list(self.clients)))
+
+    async def close(self):
+        for name, client in list(self.clients.items()):
+            close = self.factories[name][2]
+            if close is not None:
+                await self._close(name, client, close)
+        self.clients.clear()
+
+    async def _close(self, name: str, client: Any, close: Callable[[Any], Awaitable[None]]):
+        try:
+            await asyncio.wait_for(close(client), CLIENT_CHECK_TIMEOUT)
+        except Exception as e:
+            print(f"DEBUG: ⚠️ Closing {name} client failed: {type(e).__name__}: {e}")
+
+    def stats(self) -> dict:
+        return {name: self.health.get(name, {"healthy": None}) for name in self.factories}
+
+
+_google_credentials = None
+_google_credentials_lock = threading.Lock()
+
+def google_credentials():
+    """
+    One credential (and one access token refresh) for both Speech and TTS.
+    Blocking (file and metadata server reads), call it in a thread.
+    """
+    global _google_credentials
+    with _google_credentials_lock:
+        if _google_credentials is None:
+            import google.auth
+            _google_credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
+        return _google_credentials
+
+
+def grpc_client(client_class):
+    # Runs on the loop (grpc.aio channels bind to it), after acquire() loaded the credentials in a thread
+    transport_class = client_class.get_transport_class("grpc_asyncio")
+
+    def create_channel(*args, options=(), **kwargs):
+        return transport_class.create_channel(*args, options=[*options, *GRPC_KEEPALIVE_OPTIONS], **kwargs)
+
+    return client_class(transport=transport_class(credentials=_google_credentials, channel=create_channel))
+
+
+async def close_grpc_client(client):
+    await client.transport.close()
+
+
+async def check_speech(client):
+    # Speech has no free unary call, any answer from the service proves the channel and token work
+    try:
+        await client.list_operations(request={"name": ""})
+    except api_exceptions.GoogleAPICallError as e:
+        if isinstance(e, (api_exceptions.ServiceUnavailable, api_exceptions.DeadlineExceeded, api_exceptions.Unauthenticated)):
+            raise
+
+
+async def check_tts(client):
+    await client.list_voices(language_code="en-US")
+
+
+def create_groq_client() -> httpx.Client:
+    # ChatGroq calls are sync (graph nodes run in threads), so this is the pool they use.
+    # httpx drops idle connections after 5 s by default, which cost every new turn a TLS handshake
+    return httpx.Client(limits=httpx.Limits(keepalive_expiry=GROQ_KEEPALIVE_SECONDS))
+
+
+async def check_groq(client: httpx.Client):
+    def list_models():
+        response = client.get(
+            f"{GROQ_API_BASE}/openai/v1/models",
+            headers={"Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"},
+        )
+        response.raise_for_status()
+    await asyncio.to_thread(list_models)
+
+
+async def close_groq_client(client: httpx.Client):
+    client.close()
+
+
+client_registry = ClientRegistry()
+client_registry.register("speech", lambda: grpc_client(speech.SpeechAsyncClient), check_speech, close_grpc_client, prepare=google_credentials)
+client_registry.register("tts", lambda: grpc_client(texttospeech.TextToSpeechAsyncClient), check_tts, close_grpc_client, prepare=google_credentials)
+client_registry.register("groq", create_groq_client, check_groq, close_groq_client, replace=False)
@@ -0,0 +1,100 @@
+import os
+from typing import List
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph import MessagesState
+from Utils.metrics import observe
+
+# Turns (a human message and everything after it) sent to the LLM verbatim
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+# Older turns are folded into the summary this many at a time, so the summary call is rare
+SUMMARY_BATCH_TURNS = int(os.getenv("SUMMARY_BATCH_TURNS", "4"))
+
+
+class InterviewState(MessagesState):
+    summary: str               # Running summary of the turns that left the window
+    summary_until: str         # Id of the human message opening the first turn the summary doesn't cover
+
+
+def split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def drop_tool_payloads(turn: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Keep what was said in a finished turn, not the tool calls and results behind it.
+    """
+    kept = []
+    for message in turn:
+        if isinstance(message, ToolMessage):
+            continue
+        if isinstance(message, AIMessage) and message.tool_calls:
+            if message.content:
+                kept.append(AIMessage(content=message.content))
+            continue
+        kept.append(message)
+    return kept
+
+
+def summarized_turns(state: InterviewState, turns: List[List[BaseMessage]]) -> int:
+    """
+    How many leading turns the summary covers. Found by message id, positions move
+    when a barge-in rewrites a turn with RemoveMessage.
+    """
+    until = state.get("summary_until")
+    if not until:
+        return 0
+    index = next((i for i, turn in enumerate(turns) if turn[0].id == until), None)
+    if index is None:
+        # Shouldn't happen (human messages are never removed), send everything rather than lose turns
+        print(f"DEBUG: ⚠️ Summary boundary {until} not in the thread, sending all turns")
+        return 0
+    return index
+
+
+def turns_to_summarize(state: InterviewState) -> tuple[List[List[BaseMessage]], str | None]:
+    """
+    The turns that left the context window but not yet the summary, and the id
+    of the message where the summary will end once they're folded in.
+    """
+    turns = split_turns(state.get("messages", []))
+    outside_window = max(0, len(turns) - CONTEXT_KEEP_TURNS)
+    pending = turns[summarized_turns(state, turns):outside_window]
+    until = turns[outside_window][0].id if pending else None
+    return pending, until
+
+
+def build_prompt(sys_msg: SystemMessage, state: InterviewState) -> List[BaseMessage]:
+    """
+    System prompt + running summary + the unsummarized turns, with tool payloads
+    only for the turn in progress.
+    """
+    turns = split_turns(state["messages"])
+    recent = turns[summarized_turns(state, turns):]
+    prompt = [sys_msg]
+    if state.get("summary"):
+        prompt.append(SystemMessage(content=f"Summary of the interview so far:\n{state['summary']}"))
+    for turn in recent[:-1]:
+        prompt.extend(drop_tool_payloads(turn))
+    if recent:
+        prompt.extend(recent[-1])
+
+    before = count_tokens_approximately([sys_msg] + state["messages"])
+    after = count_tokens_approximately(prompt)
+    observe("agent.prompt_tokens", after)
+    print(f"DEBUG: 📏 Prompt tokens ~{before} -> ~{after} ({len(turns)} turns, {len(recent)} sent)")
+    return prompt
+
+
+def format_turns(turns: List[List[BaseMessage]]) -> str:
+    lines = []
+    for turn in turns:
+        for message in drop_tool_payloads(turn):
+            role = "Candidate" if isinstance(message, HumanMessage) else "Interviewer"
+            lines.append(f"{role}: {message.content}")
+    return "\n".join(lines)
@@ -1,18 +1,26 @@
-from pydantic import BaseModel
-from typing import Optional, Any
+from dataclasses import dataclass
+from typing import Optional
 
-class VoiceAgentEvent(BaseModel):
+@dataclass(slots=True)
+class VoiceAgentEvent:
+    """
+    One hop of the voice pipeline (STT -> agent -> TTS -> socket).
+
+    Created for every interim transcript, agent sentence and audio chunk and never
+    leaves the process, so it is a plain slotted object without validation. Input
+    from clients is validated where it comes in (FastAPI schemas, the socket route).
+    """
     type: Optional[str] = None  # e.g., "stt_output", "agent_chunk", "tts_chunk"
     text: Optional[str] = None
-    audio: Optional[bytes] = None
+    audio: bytes | memoryview | None = None  # tts_chunk slices are views into the synthesized audio
+    duration: Optional[float] = None  # Playback seconds of `audio`
     transcript: Optional[str] = None
     is_final: Optional[bool] = False
     confidence: Optional[float] = 0.0
-    
-    class Config:
-        arbitrary_types_allowed = True
 
 class AgentChunkEvent(VoiceAgentEvent):
     """Helper to quickly create agent text events"""
+    __slots__ = ()
+
     def __init__(self, text: str):
         super().__init__(type="agent_chunk", text=text)
\ No newline at end of file
@@ -1,16 +1,105 @@
-import re
+import asyncio
 from fastapi import Request, WebSocket
 from uuid import uuid4
-from typing import AsyncIterator
+from typing import AsyncIterator, List
 from ChatBot.events import VoiceAgentEvent, AgentChunkEvent
-from langchain_core.messages import HumanMessage, AIMessage
+from ChatBot.barge_in import BargeIn
+from ChatBot.latency import mark
+from ChatBot.segmenter import SentenceSegmenter
+from ChatBot.agent import schedule_summary, wait_for_summary
+from mongodb.transcripts import ensure_transcript, append_transcript, replace_transcript_text, get_transcript_page, TRANSCRIPT_PAGE_SIZE
+from Utils.metrics import increment
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, ToolMessage, RemoveMessage
 async def invoke_agent(request: Request, messages: str, conversation_id: str):
     agent = request.app.agent
     config = {
         "configurable":{"thread_id": conversation_id + request.state.user.username}
     }
+    await ensure_transcript(request.app.database, agent, config)
+    await wait_for_summary(config)
     response = await agent.ainvoke({"messages": [HumanMessage(content=messages)]}, config)
-    return response["messages"][-1].content
+    reply = response["messages"][-1].content
+    schedule_summary(agent, config)
+    try:
+        await append_transcript(
+            request.app.database, config["configurable"]["thread_id"],
+            [{"type": "human", "text": messages}, {"type": "ai", "text": reply}],
+        )
+    except Exception as e:
+        # The turn is in the checkpoint, don't fail the reply over its display copy
+        increment("transcript.write_lost")
+        print(f"ERROR: ❌ Transcript write lost for {config['configurable']['thread_id']}: {e}")
+    return reply
+
+def start_pump(stream) -> tuple[asyncio.Queue, asyncio.Task]:
+    """
+    Drain a graph stream in its own task so the consumer can cancel it mid-token or mid-tool.
+    The queue ends with None.
+    """
+    items = asyncio.Queue()
+    async def pump():
+        async for item in stream:
+            await items.put(item)
+    task = asyncio.create_task(pump())
+    # A done callback rather than `finally`: a task cancelled before its first step never runs its body
+    task.add_done_callback(lambda _: items.put_nowait(None))
+    return items, task
+
+# Transcript writes for cancelled SSE requests, kept referenced until they finish
+_background_writes = set()
+
+async def stream_agent(request: Request, message: str, conversation_id: str) -> AsyncIterator[dict]:
+    """
+    invoke_agent as a stream of {"event", "data"} dicts: token, tool_start, tool_end
+    and a final message (or error). Closing the generator, which Starlette does when
+    the client disconnects, cancels the graph run.
+    """
+    agent = request.app.agent
+    database = request.app.database
+    config = {
+        "configurable":{"thread_id": conversation_id + request.state.user.username}
+    }
+    await ensure_transcript(database, agent, config)
+    await wait_for_summary(config)
+    stream = agent.astream({"messages": [HumanMessage(content=message)]}, config, stream_mode="messages")
+    items, pump_task = start_pump(stream)
+    reply = []
+    completed = False
+    try:
+        while (item := await items.get()) is not None:
+            chunk, _ = item
+            if isinstance(chunk, ToolMessage):
+                yield {"event": "tool_end", "data": {"name": chunk.name, "id": chunk.tool_call_id}}
+            elif isinstance(chunk, AIMessageChunk):
+                for call in chunk.tool_call_chunks:
+                    if call.get("name"):
+                        # Text before a tool call isn't the answer, the message after the tool is
+                        reply = []
+                        yield {"event": "tool_start", "data": {"name": call["name"], "id": call.get("id")}}
+                if chunk.content:
+                    reply.append(chunk.content)
+                    yield {"event": "token", "data": {"text": chunk.content}}
+        try:
+            pump_task.result()
+        except Exception as e:
+            print(f"AGENT ERROR: {e}")
+            yield {"event": "error", "data": {"detail": "The agent failed to answer"}}
+            return
+        completed = True
+        schedule_summary(agent, config)
+        yield {"event": "message", "data": {"message": "".join(reply), "type": "ai"}}
+    finally:
+        if not pump_task.done():
+            pump_task.cancel()
+            increment("chat.stream.cancelled")
+            print(f"DEBUG: 🛑 Client left, cancelled generation for {conversation_id}")
+        entries = [{"type": "human", "text": message}]
+        if completed:
+            entries.append({"type": "ai", "text": "".join(reply)})
+        # A new task, so the write isn't cancelled along with a disconnected request
+        task = asyncio.create_task(append_transcript(database, config["configurable"]["thread_id"], entries))
+        _background_writes.add(task)
+        task.add_done_callback(_background_writes.discard)
 
 # async def agent_stream(
 #     event_stream: AsyncIterator[VoiceAgentEvent],
@@ -52,16 +141,57 @@ async def invoke_agent(request: Request, messages: str, conversation_id: str):
 #             except Exception as e:
 #                 print(f"AGENT ERROR: {e}")
 
+async def record_spoken_reply(agent, config: dict, human_id: str, spoken: List[str]) -> bool:
+    """
+    Replace the AI/tool messages after the interrupted turn's human message with only
+    the sentences the candidate heard. Returns False, changing nothing, if that human
+    message never reached the checkpoint (barge-in before the graph saved it).
+    """
+    state = await agent.aget_state(config)
+    messages = state.values.get("messages", []) if state else []
+    index = next((i for i, m in enumerate(messages) if m.id == human_id), None)
+    if index is None:
+        return False
+    updates = [RemoveMessage(id=m.id) for m in messages[index + 1:]]
+    if spoken:
+        updates.append(AIMessage(content=" ".join(spoken)))
+    if updates:
+        await agent.aupdate_state(config, {"messages": updates}, as_node="assistant")
+    print(f"DEBUG: ✂️ Recorded interrupted reply: '{' '.join(spoken)}'")
+    return True
+
 async def agent_stream(
     event_stream: AsyncIterator[VoiceAgentEvent], 
-    request: WebSocket
+    request: WebSocket,
+    barge_in: BargeIn | None = None
 ) -> AsyncIterator[VoiceAgentEvent]:
     
     agent = request.app.agent
-    thread_id = str(uuid4())
+    database = request.app.database
+    # Set by the /socket/ handshake, same key as invoke_agent so the thread resumes on reconnect
+    thread_id = request.state.conversation_id + request.state.user.username
+    config = {"configurable": {"thread_id": thread_id}}
+    barge_in = barge_in or BargeIn(enabled=False)
+    # The previous reply, settled once we know whether the candidate cut into it
+    # (often after it was fully generated, while the client was still playing it)
+    last_turn = None
+    await ensure_transcript(database, agent, config)
     
     # Sentence Buffer State
-    text_buffer = ""
+    segmenter = SentenceSegmenter()
+
+    async def settle_turn(turn: dict):
+        heard = barge_in.heard(turn["cancelled"])
+        if heard is None:
+            return
+        if not await record_spoken_reply(agent, config, turn["human_id"], heard):
+            return
+        if not turn["written"]:
+            await append_transcript(database, thread_id, [
+                {"type": "human", "text": turn["question"]}, {"type": "ai", "text": " ".join(heard)}
+            ])
+        elif turn["ai_entry"] is not None:
+            await replace_transcript_text(database, turn["ai_entry"], " ".join(heard))
 
     async for event in event_stream:
         # Pass through upstream events (logs, STT status)
@@ -73,56 +203,92 @@ async def agent_stream(
             print(f"DEBUG: 🧠 Agent Thinking on: {event.text}")
             
             try:
-                human_msg = HumanMessage(content=event.text)
+                await wait_for_summary(config)
+                # Fix up the previous turn now that playback has settled what was actually heard
+                if last_turn is not None:
+                    turn, last_turn = last_turn, None
+                    await settle_turn(turn)
+
+                cancelled = barge_in.start_turn()
+                mark("agent_request")
+                # Own id, so the rewrite after a barge-in finds this turn and not an older one
+                human_msg = HumanMessage(content=event.text, id=str(uuid4()))
+                turn = {"cancelled": cancelled, "human_id": human_msg.id, "question": event.text, "written": False, "ai_entry": None}
+                reply = []
 
                 stream = agent.astream(
                     {"messages": [human_msg]},
-                    {"configurable": {"thread_id": thread_id}},
+                    config,
                     stream_mode="messages",
                 )
 
-                async for message, _ in stream:
-                    if hasattr(message, 'content') and message.content:
+                # Drain the graph in its own task so a barge-in can cancel it mid-token or mid-tool
+                items, pump_task = start_pump(stream)
+                barge_in.register(cancelled, pump_task)
+
+                while (item := await items.get()) is not None:
+                    if cancelled.is_set():
+                        break
+                    message, _ = item
+                    if isinstance(message, AIMessageChunk) and any(call.get("name") for call in message.tool_call_chunks):
+                        # As in stream_agent: the answer is the message after the tool, not the text before it
+                        reply = []
+                    # Model text only: tool results are neither spoken nor part of the transcript,
+                    # the same as the text path and the checkpoint backfill (display_messages)
+                    if isinstance(message, AIMessageChunk) and message.content:
+                        mark("first_token")
                         token = message.content
-                        text_buffer += token
 
                         # --- SENTENCE DETECTION LOGIC ---
-                        # Check if buffer contains a sentence ending (. ? !) followed by space or newline
-                        # We use a regex lookbehind to find the split point
-                        if re.search(r'[.!?]\s+', text_buffer):
-                            parts = re.split(r'(?<=[.!?])\s+', text_buffer)
-                            
-                            # Yield all complete sentences
-                            for i in range(len(parts) - 1):
-                                sentence = parts[i]
-                                if sentence.strip():
-                                    print(f"DEBUG: 📤 Yielding Sentence: '{sentence}'")
-                                    yield AgentChunkEvent(text=sentence)
-                            
-                            # Keep the incomplete part (if any) in the buffer
-                            text_buffer = parts[-1]
+                        # Only the new characters are scanned, see ChatBot/segmenter.py
+                        for sentence in segmenter.feed(token):
+                            print(f"DEBUG: 📤 Yielding Sentence: '{sentence}'")
+                            mark("first_sentence")
+                            reply.append(sentence)
+                            yield AgentChunkEvent(text=sentence)
+
+                await asyncio.wait({pump_task})
+                if cancelled.is_set():
+                    last_turn = turn
+                    segmenter.reset()
+                    continue
+                pump_task.result()
                 
                 # End of Stream: Flush whatever is left in the buffer
-                if text_buffer.strip():
+                if (text_buffer := segmenter.flush()):
                      print(f"DEBUG: 📤 Yielding Final Fragment: '{text_buffer}'")
+                     mark("first_sentence")
+                     reply.append(text_buffer)
                      yield AgentChunkEvent(text=text_buffer)
-                     text_buffer = ""
+
+                # Written now so history is current, rewritten by settle_turn if the candidate cuts in
+                entry_ids = await append_transcript(database, thread_id, [
+                    {"type": "human", "text": event.text}, {"type": "ai", "text": " ".join(reply)}
+                ])
+                turn["written"] = True
+                turn["ai_entry"] = entry_ids[1] if len(entry_ids) == 2 else None
+                last_turn = turn
+                schedule_summary(agent, config)
                         
             except Exception as e:
                 print(f"AGENT ERROR: {e}")
-def get_conversation_history(request: Request, conversation_id: str):
-    agent = request.app.agent
+                # Don't let half a sentence of the failed reply lead into the next one
+                segmenter.reset()
+            finally:
+                barge_in.generating = False
+
+    await wait_for_summary(config)
+    if last_turn is not None:
+        await settle_turn(last_turn)
+
+async def get_conversation_history(
+    request: Request, conversation_id: str, limit: int = TRANSCRIPT_PAGE_SIZE, before: str | None = None
+) -> dict:
+    """
+    A page of the display transcript, read from the materialized transcript
+    collection instead of deserializing the whole checkpoint.
+    """
     config = {
         "configurable":{"thread_id": conversation_id + request.state.user.username}
     }
-    last_state = agent.get_state(config)
-    print("Last state:", last_state)
-    response = []
-    if not last_state or not hasattr(last_state, 'values') or 'messages' not in last_state.values:
-        return response
-    for  index, curr in enumerate(last_state.values["messages"]):
-        if isinstance(curr, HumanMessage):
-            response.append({"type": "human", "text": curr.content})
-        elif isinstance(curr, AIMessage) and (index == len(last_state.values["messages"]) - 1 or isinstance(last_state.values["messages"][index + 1], HumanMessage)):   
-            response.append({"type": "ai", "text": curr.content})
-    return response
\ No newline at end of file
+    return await get_transcript_page(request.app.database, request.app.agent, config, limit, before)
\ No newline at end of file
@@ -0,0 +1,50 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from Utils.metrics import observe
+
+# Points of a voice turn, in pipeline order:
+#   final_transcript -> agent_request -> first_token -> first_sentence
+#   -> tts_request -> tts_response -> first_audio_byte
+# Each is recorded once per turn as seconds since the final transcript, under "voice.<point>",
+# and again under "voice.first_turn.<point>" or "voice.steady.<point>" so the first turn of a
+# session (cold clients and connections) can be compared with the rest.
+
+
+class TurnTracer:
+    """
+    Timestamps the current turn of one voice socket.
+    """
+    def __init__(self):
+        self.started: Optional[float] = None
+        self.marks = {}
+        self.turns = 0
+
+    def begin(self):
+        self.started = time.perf_counter()
+        self.turns += 1
+        self.marks = {"final_transcript": self.started}
+
+    def mark(self, point: str):
+        if self.started is None or point in self.marks:
+            return
+        now = time.perf_counter()
+        self.marks[point] = now
+        observe(f"voice.{point}", now - self.started)
+        observe(f"voice.{'first_turn' if self.turns == 1 else 'steady'}.{point}", now - self.started)
+
+
+# Set per WebSocket like active_websocket, tasks of the socket inherit it
+active_tracer: ContextVar[Optional[TurnTracer]] = ContextVar("active_tracer", default=None)
+
+
+def begin_turn():
+    tracer = active_tracer.get()
+    if tracer is not None:
+        tracer.begin()
+
+
+def mark(point: str):
+    tracer = active_tracer.get()
+    if tracer is not None:
+        tracer.mark(point)
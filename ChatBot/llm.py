@@ -1,9 +1,12 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
 from ChatBot.tools.tool_list import tool_list
+from ChatBot.clients import client_registry
+import os
 
 
 def get_llm():
+    # Imported here: the SDK is only needed once the agent is built in lifespan
+    from langchain_groq import ChatGroq
+    # from langchain_google_genai import ChatGoogleGenerativeAI
     # llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash",temperature=0.5)
     llm = ChatGroq(
         model="openai/gpt-oss-120b",
@@ -12,5 +15,17 @@ def get_llm():
         reasoning_format="parsed",
         timeout=None,
         max_retries=2,
+        http_client=client_registry.get("groq"),
     )
     return llm.bind_tools(tool_list)
+
+def get_summary_llm():
+    # Plain model (no tools) for compressing old interview turns
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model=os.getenv("SUMMARY_MODEL", "openai/gpt-oss-120b"),
+        temperature=0,
+        reasoning_format="parsed",
+        max_retries=2,
+        http_client=client_registry.get("groq"),
+    )
@@ -0,0 +1,100 @@
+import asyncio
+from typing import Any, Callable, Optional
+
+# Overflow policies
+DROP_OLDEST = "drop_oldest"   # Evict the oldest item, keeps latency low for live audio
+DROP_NEWEST = "drop_newest"   # Refuse the incoming item
+BLOCK = "block"               # put() waits for space, pushing back on the producer
+PAUSE = "pause"               # Ask the producer to pause near the limit, drop oldest past it
+COALESCE = "coalesce"         # Merge into the last queued item when possible, otherwise block
+
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK, PAUSE, COALESCE)
+
+
+class BoundedQueue(asyncio.Queue):
+    """
+    asyncio.Queue with a size limit, an overflow policy and counters.
+
+    The underlying queue is unbounded so the None stop sentinel is never
+    dropped or blocked; the limit only applies to real items.
+    """
+    def __init__(
+        self,
+        name: str,
+        limit: int = 0,
+        policy: str = DROP_OLDEST,
+        coalesce: Optional[Callable[[Any, Any], bool]] = None,
+        on_pressure: Optional[Callable[[bool], None]] = None,
+    ):
+        super().__init__()
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.name = name
+        self.limit = limit
+        self.policy = policy
+        self.coalesce = coalesce
+        self.on_pressure = on_pressure
+        self.paused = False
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.high_water = 0
+        self._space = asyncio.Event()
+
+    def _full(self) -> bool:
+        return bool(self.limit) and self.qsize() >= self.limit
+
+    async def put(self, item):
+        if item is not None and self.policy in (BLOCK, COALESCE):
+            while self._full() and not self._can_coalesce(item):
+                self._space.clear()
+                await self._space.wait()
+        self.put_nowait(item)
+
+    def _can_coalesce(self, item) -> bool:
+        return self.policy == COALESCE and self.coalesce is not None and not self.empty() and self.coalesce(self._queue[-1], item)
+
+    def put_nowait(self, item):
+        if item is not None:
+            self.received += 1
+            if self._can_coalesce(item):
+                self._queue[-1] = item
+                self.coalesced += 1
+                return
+            if self._full():
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                if self.policy in (DROP_OLDEST, PAUSE) and self._queue[0] is not None:
+                    self._queue.popleft()
+                    self.task_done()
+                    self.dropped += 1
+
+        super().put_nowait(item)
+        self.high_water = max(self.high_water, self.qsize())
+
+        if self.policy == PAUSE and not self.paused and self.limit and self.qsize() >= self.limit * 3 // 4:
+            self.paused = True
+            if self.on_pressure:
+                self.on_pressure(True)
+
+    def _get(self):
+        item = super()._get()
+        self._space.set()
+        if self.paused and self.qsize() <= self.limit // 4:
+            self.paused = False
+            if self.on_pressure:
+                self.on_pressure(False)
+        return item
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.qsize(),
+            "limit": self.limit,
+            "policy": self.policy,
+            "high_water": self.high_water,
+            "received": self.received,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "paused": self.paused,
+        }
@@ -0,0 +1,123 @@
+import os
+from typing import List, Optional
+
+# "First chunk fast": the first segment of a reply may end at a clause (, ; :)
+# once it has this many characters, or at a word break after the max
+FIRST_CHUNK_FAST = os.getenv("SEGMENT_FIRST_CHUNK_FAST", "true").lower() == "true"
+FIRST_CHUNK_MIN_CHARS = int(os.getenv("SEGMENT_FIRST_CHUNK_MIN_CHARS", "25"))
+FIRST_CHUNK_MAX_CHARS = int(os.getenv("SEGMENT_FIRST_CHUNK_MAX_CHARS", "100"))
+# Later segments: short sentences are joined up to this size, long runs are cut at a word break
+MIN_SEGMENT_CHARS = int(os.getenv("SEGMENT_MIN_CHARS", "40"))
+MAX_SEGMENT_CHARS = int(os.getenv("SEGMENT_MAX_CHARS", "250"))
+
+# Words (lowercase, without the final dot) whose dot doesn't end a sentence
+ABBREVIATIONS = {
+    "e.g", "i.e", "vs", "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st",
+    "approx", "fig", "eq", "cf", "al", "inc", "ltd", "dept", "est", "min", "max",
+}
+SENTENCE_ENDS = ".!?"
+CLAUSE_ENDS = ",;:"
+CLOSERS = "\"')]"
+
+
+class SentenceSegmenter:
+    """
+    Splits a token stream into speakable segments, scanning each character once.
+
+    feed() returns the segments completed by the new text, flush() returns
+    whatever is left at the end of the reply and resets for the next one.
+    """
+    def __init__(
+        self,
+        first_chunk_fast: bool = FIRST_CHUNK_FAST,
+        first_chunk_min_chars: int = FIRST_CHUNK_MIN_CHARS,
+        first_chunk_max_chars: int = FIRST_CHUNK_MAX_CHARS,
+        min_chars: int = MIN_SEGMENT_CHARS,
+        max_chars: int = MAX_SEGMENT_CHARS,
+    ):
+        self.first_chunk_fast = first_chunk_fast
+        self.first_chunk_min_chars = first_chunk_min_chars
+        self.first_chunk_max_chars = first_chunk_max_chars
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.reset()
+
+    def reset(self):
+        self.buffer = ""
+        self.pos = 0          # Next character to scan
+        self.first = True     # Still looking for the first segment of the reply
+        self.in_code = False  # Inside `backticks`
+
+    def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        segments = []
+        start = 0
+        buffer = self.buffer
+
+        # One character of lookahead is needed to see the whitespace after a boundary
+        while self.pos < len(buffer) - 1:
+            pos = self.pos
+            char = buffer[pos]
+            cut = None
+
+            if char == "`":
+                self.in_code = not self.in_code
+            elif not self.in_code:
+                if char in SENTENCE_ENDS:
+                    end = pos + 1
+                    while end < len(buffer) and buffer[end] in CLOSERS:
+                        end += 1
+                    if end == len(buffer):
+                        break  # Wait for the character after the closers
+                    if buffer[end].isspace() and self._ends_sentence(buffer, start, pos):
+                        cut = end
+                elif char == "\n" and buffer[pos + 1] == "\n":
+                    cut = pos
+                elif self.first and self.first_chunk_fast and char in CLAUSE_ENDS and buffer[pos + 1].isspace():
+                    if pos + 1 - start >= self.first_chunk_min_chars:
+                        cut = pos + 1
+
+            limit = self.first_chunk_max_chars if (self.first and self.first_chunk_fast) else self.max_chars
+            if cut is None and pos + 1 - start >= limit and buffer[pos + 1].isspace():
+                cut = pos + 1
+
+            self.pos += 1
+            if cut is None:
+                continue
+            segment = buffer[start:cut].strip()
+            # Join short sentences after the first chunk, a forced cut always goes out
+            if not self.first and len(segment) < self.min_chars and pos + 1 - start < limit:
+                continue
+            if segment:
+                segments.append(segment)
+                self.first = False
+            start = cut
+
+        # Drop emitted text so the buffer only holds the open segment
+        if start:
+            self.buffer = buffer[start:]
+            self.pos -= start
+        return segments
+
+    def flush(self) -> Optional[str]:
+        rest = self.buffer.strip()
+        self.reset()
+        return rest or None
+
+    @staticmethod
+    def _ends_sentence(buffer: str, start: int, pos: int) -> bool:
+        if buffer[pos] != ".":
+            return True
+        word_start = pos
+        while word_start > start and not buffer[word_start - 1].isspace():
+            word_start -= 1
+        word = buffer[word_start:pos].lstrip("(\"'")
+        if word.lower() in ABBREVIATIONS:
+            return False
+        # Initials like "J. Smith"
+        if len(word) == 1 and word.isupper():
+            return False
+        # Numbered list items like "1. Use a heap" at the start of a segment or line
+        if word.isdigit() and (not buffer[start:word_start].strip() or buffer[word_start - 1] == "\n"):
+            return False
+        return True
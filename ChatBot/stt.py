@@ -1,13 +1,291 @@
+import os
+import re
 import time
 import asyncio
 import json
-from google.cloud import speech
-from google.api_core.exceptions import OutOfRange, InvalidArgument, InternalServerError
+from collections import deque
 from ChatBot.events import VoiceAgentEvent 
+from Utils.lazy import lazy_import
+from ChatBot.clients import client_registry
+from ChatBot.audio_formats import AudioFormat, AudioInput, AUDIO_INPUT_FORMATS
+from ChatBot.vad import SPEECH_END
+from ChatBot.webm import WebmClusterTracker
+from ChatBot.queues import BoundedQueue, BLOCK
+from Utils.metrics import increment
+
+# Loaded on the first voice session, not at worker boot
+speech = lazy_import("google.cloud.speech")
+api_exceptions = lazy_import("google.api_core.exceptions")
 
 STREAM_LIMIT = 240 # 4 Minutes
 
-async def stt_stream(audio_queue: asyncio.Queue, websocket):
+# "seamless" overlaps recognize streams on rotation, "stop_and_wait" is the old stop_audio/start_audio dance
+STT_ROTATION_MODE = os.getenv("STT_ROTATION_MODE", "seamless")
+# Seconds of recent audio replayed into the next stream so words at the boundary aren't cut
+STT_ROTATION_OVERLAP = float(os.getenv("STT_ROTATION_OVERLAP", "1.5"))
+# Longest run of words we try to match when de-duplicating the replayed overlap
+MAX_OVERLAP_WORDS = 15
+# Chunks waiting to go out on one recognize stream. When Google falls behind, pump_audio
+# waits here and the socket's audio queue applies its overflow policy instead
+STT_FEED_LIMIT = int(os.getenv("STT_FEED_LIMIT", "50"))
+
+async def get_speech_client() -> "speech.SpeechAsyncClient":
+    """
+    One long-lived client per process, its gRPC channel is shared by every stream.
+    Warmed and health-checked by the registry in ChatBot/clients.py.
+    """
+    return await client_registry.acquire("speech")
+
+def get_streaming_config(audio_format: AudioFormat = AUDIO_INPUT_FORMATS["webm_opus"]) -> "speech.StreamingRecognitionConfig":
+    config = speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding[audio_format.encoding],
+        sample_rate_hertz=audio_format.sample_rate,
+        language_code="en-US",
+        enable_automatic_punctuation=True,
+    )
+    return speech.StreamingRecognitionConfig(
+        config=config,
+        interim_results=True
+    )
+
+def _normalize(token: str) -> str:
+    return re.sub(r"[^\w']", "", token.lower())
+
+def strip_overlap(previous: str, current: str) -> str:
+    """
+    Drop the leading words of `current` that repeat the tail of `previous`.
+    """
+    prev_words = [word for word in map(_normalize, previous.split()) if word]
+    tokens = current.split()
+    # Matching skips punctuation-only tokens, the cut is made on the same tokens
+    positions = [i for i, token in enumerate(tokens) if _normalize(token)]
+    cur_words = [_normalize(tokens[i]) for i in positions]
+    for size in range(min(len(prev_words), len(cur_words), MAX_OVERLAP_WORDS), 0, -1):
+        if prev_words[-size:] == cur_words[:size]:
+            return " ".join(tokens[positions[size - 1] + 1:])
+    return current
+
+class RecognizeStream:
+    """
+    A single streaming_recognize call fed from its own queue.
+    Results, errors and the final close are reported on the shared `results` queue.
+    """
+    def __init__(self, client, header: bytes | None, overlap: list, results: asyncio.Queue, replayed: bool,
+                 audio_format: AudioFormat = AUDIO_INPUT_FORMATS["webm_opus"]):
+        self.client = client
+        self.results = results
+        self.replayed = replayed  # Starts with audio the previous stream already heard
+        self.audio_format = audio_format
+        self.had_final = False
+        self.started = time.monotonic()
+        self.feed = BoundedQueue("stt_feed", STT_FEED_LIMIT + len(overlap) + 1, BLOCK)
+        if header is not None:
+            self.feed.put_nowait(header)
+        increment("stt.recognize_streams")
+        for chunk in overlap:
+            self.feed.put_nowait(chunk)
+        self.task = asyncio.create_task(self._run())
+
+    async def _requests(self):
+        yield speech.StreamingRecognizeRequest(streaming_config=get_streaming_config(self.audio_format))
+        while (chunk := await self.feed.get()) is not None:
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    async def _run(self):
+        try:
+            responses = await self.client.streaming_recognize(requests=self._requests())
+            async for response in responses:
+                if not response.results: continue
+                result = response.results[0]
+                if not result.alternatives: continue
+                await self.results.put(("result", self, result))
+        except Exception as e:
+            await self.results.put(("error", self, e))
+        finally:
+            # Nothing reads the feed anymore, release a pump_audio waiting for space
+            self.feed.limit = 0
+            while not self.feed.empty():
+                self.feed.get_nowait()
+            await self.results.put(("closed", self, None))
+
+    async def send(self, chunk: bytes):
+        await self.feed.put(chunk)
+
+    def close(self):
+        # Ending the request stream lets Google finalize what it already heard
+        self.feed.put_nowait(None)
+
+async def seamless_stt_stream(audio_queue: asyncio.Queue, websocket, audio_format: AudioFormat, first_chunk: bytes):
+    """
+    Rotates recognize streams without pausing the browser.
+
+    WebM input is followed by a WebmClusterTracker. On rotation, or after a
+    stream error, the next stream is opened with the WebM header (up to the
+    first Cluster) plus the audio from a Cluster start about
+    STT_ROTATION_OVERLAP seconds back, before the old one is closed. Words
+    repeated across the boundary are stripped from the new stream. When no
+    Cluster started recently enough the old stream keeps going until one does.
+
+    Raw PCM input has no header and arrives VAD-gated (ChatBot/vad.py): a stream
+    is opened when speech starts and closed on SPEECH_END, so Google finalizes
+    right away and hears no silence.
+    """
+    print("DEBUG: STT Stream Initialized (Seamless Rotation Strategy)")
+    tracker = None
+    if audio_format.encoding == "WEBM_OPUS":
+        tracker = WebmClusterTracker()
+        tracker.feed(first_chunk, time.monotonic())
+
+    results = asyncio.Queue()
+    recent = deque()  # (arrival time, chunk) for PCM overlap replay
+    streams = set()
+    current = {"stream": None, "utterance_start": tracker is None, "waiting": False}
+    if tracker is not None:
+        current["stream"] = RecognizeStream(await get_speech_client(), first_chunk, [], results, replayed=False)
+        streams.add(current["stream"])
+    last_final = ""
+
+    def replay_audio(now: float):
+        """(header, overlap chunks) for a new stream, None while there's no Cluster start to begin at."""
+        if tracker is None:
+            return None, [chunk for _, chunk in recent]
+        if not tracker.header:
+            # Header not parsed (yet): replay the whole first chunk as before
+            return first_chunk, [chunk for _, chunk in recent]
+        blocks = tracker.replay(now, STT_ROTATION_OVERLAP)
+        if blocks is None:
+            return None
+        return tracker.header, blocks
+
+    async def open_stream(reason: str, now: float, replayed: bool = True) -> bool:
+        replay = replay_audio(now)
+        if replay is None:
+            if not current["waiting"]:
+                print(f"DEBUG: ⏳ {reason}. Waiting for the next WebM cluster to rotate.")
+                current["waiting"] = True
+            return False
+        current["waiting"] = False
+        try:
+            # From the registry every time, so a stream never opens on a client it replaced
+            client = await get_speech_client()
+        except Exception as e:
+            print(f"🛑 STT client unavailable ({reason}): {e}")
+            return False
+        header, overlap = replay
+        old = current["stream"]
+        new = RecognizeStream(client, header, overlap, results, replayed=replayed, audio_format=audio_format)
+        streams.add(new)
+        current["stream"] = new
+        print(f"DEBUG: 🔁 {reason}. Rotated STT stream with {len(overlap)} overlap packets.")
+        if old is not None:
+            old.close()
+        return True
+
+    async def feed_audio(data):
+        if data is SPEECH_END:
+            # Ending the request stream makes Google finalize the utterance now
+            if current["stream"] is not None:
+                current["stream"].close()
+                current["stream"] = None
+            current["utterance_start"] = True
+            recent.clear()
+            return
+        if len(data) == 0:
+            return
+        now = time.monotonic()
+        if tracker is not None:
+            tracker.feed(data, now)
+        recent.append((now, data))
+        while recent and now - recent[0][0] > STT_ROTATION_OVERLAP:
+            recent.popleft()
+
+        stream = current["stream"]
+        if stream is None and current["utterance_start"]:
+            # New utterance, nothing to replay or de-duplicate (the VAD pre-roll is in `data`)
+            current["utterance_start"] = False
+            await open_stream("Speech start", now, replayed=False)
+        elif stream is None:
+            # Previous stream failed, reopen lazily so a silent mic doesn't spin
+            await open_stream("Stream error recovery", now)
+        elif now - stream.started <= STREAM_LIMIT or not await open_stream("Time limit", now):
+            # Past the limit the old stream keeps the audio until the new one can start
+            await stream.send(data)
+
+    async def pump_audio():
+        if tracker is None:
+            # Raw PCM has no header, its first chunk is the start of the first utterance
+            await feed_audio(first_chunk)
+        while (data := await audio_queue.get()) is not None:
+            await feed_audio(data)
+        print("DEBUG: End of Audio Stream.")
+        if current["stream"] is not None:
+            current["stream"].close()
+            current["stream"] = None
+        await results.put(("audio_done", None, None))
+
+    pump = asyncio.create_task(pump_audio())
+    audio_done = False
+    try:
+        while streams or not audio_done:
+            kind, stream, payload = await results.get()
+
+            if kind == "audio_done":
+                audio_done = True
+            elif kind == "closed":
+                streams.discard(stream)
+            elif kind == "error":
+                if isinstance(payload, (api_exceptions.OutOfRange, api_exceptions.InvalidArgument, api_exceptions.InternalServerError)):
+                    print(f"⚠️ Stream Error ({payload}). Rotating...")
+                else:
+                    print(f"🛑 STT Loop Error: {payload}")
+                if stream is current["stream"]:
+                    current["stream"] = None
+            elif kind == "result":
+                transcript = payload.alternatives[0].transcript
+                is_final = payload.is_final
+
+                # Interims from a draining stream would fight the new one in the UI
+                if not is_final and stream is not current["stream"]:
+                    continue
+                # The first utterance of a replayed stream may repeat the previous final
+                if stream.replayed and not stream.had_final and last_final:
+                    transcript = strip_overlap(last_final, transcript)
+                if not transcript.strip(): continue
+
+                if is_final:
+                    stream.had_final = True
+                    last_final = transcript
+
+                yield VoiceAgentEvent(
+                    type="stt_output",
+                    text=transcript,
+                    is_final=is_final,
+                    confidence=payload.alternatives[0].confidence
+                )
+    finally:
+        pump.cancel()
+        for stream in streams:
+            stream.task.cancel()
+
+async def stt_stream(audio_queue: asyncio.Queue, websocket, audio_input: AudioInput | None = None):
+    """
+    The input format is only fixed once audio flows (the config message can come
+    after the socket connects), so wait for the first chunk before reading it.
+    """
+    first_chunk = await audio_queue.get()
+    if first_chunk is None:
+        print("DEBUG: End of Audio Stream.")
+        return
+    audio_format = audio_input.format if audio_input is not None else AUDIO_INPUT_FORMATS["webm_opus"]
+    # Stop-and-wait restarts the browser's recorder for a new WebM header, raw PCM has none
+    if STT_ROTATION_MODE == "seamless" or audio_format.encoding != "WEBM_OPUS":
+        async for event in seamless_stt_stream(audio_queue, websocket, audio_format, first_chunk):
+            yield event
+    else:
+        async for event in stop_and_wait_stt_stream(audio_queue, websocket, first_chunk):
+            yield event
+
+async def stop_and_wait_stt_stream(audio_queue: asyncio.Queue, websocket, first_chunk: bytes | None = None):
     print("DEBUG: STT Stream Initialized (Stop-and-Wait Strategy)")
     
     while True:
@@ -15,24 +293,18 @@ async def stt_stream(audio_queue: asyncio.Queue, websocket):
             # 1. Wait for Audio (This will block until the frontend starts sending)
             # On the first run, this grabs the header instantly.
             # On rotation, this waits for the "start_audio" command to take effect.
-            initial_chunk = await audio_queue.get()
+            if first_chunk is not None:
+                initial_chunk, first_chunk = first_chunk, None
+            else:
+                initial_chunk = await audio_queue.get()
             
             if initial_chunk is None:
                 print("DEBUG: End of Audio Stream.")
                 break 
 
             # 2. Setup Google Client
-            client = speech.SpeechAsyncClient()
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
-                sample_rate_hertz=48000,
-                language_code="en-US",
-                enable_automatic_punctuation=True,
-            )
-            streaming_config = speech.StreamingRecognitionConfig(
-                config=config,
-                interim_results=True
-            )
+            client = await get_speech_client()
+            streaming_config = get_streaming_config()
 
             async def request_generator(header_chunk):
                 # Send Config & Header
@@ -98,13 +370,13 @@ async def stt_stream(audio_queue: asyncio.Queue, websocket):
                         confidence=result.alternatives[0].confidence
                     )
 
-            except InternalServerError:
+            except api_exceptions.InternalServerError:
                 print("WARN: Google 500 Error. Restarting...")
                 continue
 
         except StopAsyncIteration:
             break
-        except (OutOfRange, InvalidArgument) as e:
+        except (api_exceptions.OutOfRange, api_exceptions.InvalidArgument) as e:
             # Fallback if something still goes wrong
             print(f"⚠️ Stream Error ({e}). Forcing Restart...")
             await websocket.send_text(json.dumps({"type": "stop_audio"}))
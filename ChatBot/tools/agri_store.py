@@ -0,0 +1,88 @@
+import os
+import bisect
+import difflib
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+SEARCH_COLUMNS = ("state", "district", "market", "commodity", "variety")
+# Fall back to prefix/fuzzy matching when a filter has no exact (case-insensitive) match.
+# Off by default so search_data returns exactly what the old scan did (no rows, not a guess)
+FUZZY_MATCH = os.getenv("AGRI_FUZZY_MATCH", "false").lower() == "true"
+FUZZY_CUTOFF = float(os.getenv("AGRI_FUZZY_CUTOFF", "0.8"))
+
+
+class AgriStore:
+    """
+    Market price rows with a lowercase value -> row positions index per filter column.
+
+    Rows are stored once with categorical columns. A query intersects the
+    sorted position arrays of its filters, smallest first, so rows come back
+    in file order exactly like the old full-frame scan.
+    """
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.indexes: Dict[str, Dict[str, np.ndarray]] = {}
+        self.keys: Dict[str, List[str]] = {}
+        for column in SEARCH_COLUMNS:
+            self.indexes[column] = self._build_index(df[column])
+            self.keys[column] = sorted(self.indexes[column])
+
+    @classmethod
+    def from_csv(cls, path: str) -> "AgriStore":
+        df = pd.read_csv(path, dtype={column: "category" for column in SEARCH_COLUMNS})
+        return cls(df)
+
+    @staticmethod
+    def _build_index(series: pd.Series) -> Dict[str, np.ndarray]:
+        # Lowercase the (few) categories instead of every row, then group rows by code
+        categorical = series.astype("category")
+        lowered, codes_by_category = np.unique(
+            np.asarray(categorical.cat.categories.astype(str).str.lower()), return_inverse=True
+        )
+        codes = categorical.cat.codes.to_numpy()
+        valid = codes >= 0  # NaN never matched a filter
+        lowered_codes = np.full(len(codes), -1, dtype=np.int64)
+        lowered_codes[valid] = codes_by_category[codes[valid]]
+
+        order = np.argsort(lowered_codes, kind="stable")
+        sorted_codes = lowered_codes[order]
+        starts = np.searchsorted(sorted_codes, np.arange(len(lowered)), side="left")
+        ends = np.searchsorted(sorted_codes, np.arange(len(lowered)), side="right")
+        return {key: order[start:end] for key, start, end in zip(lowered, starts, ends) if end > start}
+
+    def _postings(self, column: str, value: str) -> np.ndarray:
+        index = self.indexes[column]
+        key = value.lower()
+        if key in index or not FUZZY_MATCH:
+            return index.get(key, np.empty(0, dtype=np.int64))
+
+        # Voice transcripts: "port" -> "port blair", "tomatto" -> "tomato"
+        matches = self._prefix_matches(column, key)
+        if not matches:
+            matches = difflib.get_close_matches(key, self.keys[column], n=3, cutoff=FUZZY_CUTOFF)
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        print(f"DEBUG: 🔎 {column} '{value}' matched {matches}")
+        return np.sort(np.concatenate([index[k] for k in matches]))
+
+    def _prefix_matches(self, column: str, key: str) -> List[str]:
+        keys = self.keys[column]
+        position = bisect.bisect_left(keys, key)
+        matches = []
+        while position < len(keys) and keys[position].startswith(key):
+            matches.append(keys[position])
+            position += 1
+        return matches
+
+    def search(self, limit: int = 10, **filters: Optional[str]) -> pd.DataFrame:
+        postings = [self._postings(column, value) for column, value in filters.items() if value]
+        if not postings:
+            return self.df.head(limit)
+        postings.sort(key=len)
+        rows = postings[0]
+        for other in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return self.df.iloc[rows[:limit]]
@@ -1,7 +1,21 @@
-import pandas as pd
+import threading
 from langchain_core.tools import tool 
-# Load data once (replace with your actual CSV file)
-df = pd.read_csv("agri_data.csv")
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """
+    Load the data once (replace with your actual CSV file), indexed for lookups.
+    Deferred so pandas and the CSV stay out of worker boot; server.py preloads it after startup.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from ChatBot.tools.agri_store import AgriStore
+                _store = AgriStore.from_csv("agri_data.csv")
+    return _store
 
 @tool
 def search_data(state=None, district=None, market=None, commodity=None, variety=None):
@@ -18,17 +32,12 @@ def search_data(state=None, district=None, market=None, commodity=None, variety=
     Returns:
         pd.DataFrame: Filtered results (top 10 rows)
     """
-    results = df.copy()
-    print("here")
-    if state:
-        results = results[results["state"].str.lower() == state.lower()]
-    if district:
-        results = results[results["district"].str.lower() == district.lower()]
-    if market:
-        results = results[results["market"].str.lower() == market.lower()]
-    if commodity:
-        results = results[results["commodity"].str.lower() == commodity.lower()]
-    if variety:
-        results = results[results["variety"].str.lower() == variety.lower()]
-    
-    return results.head(10).to_string(index=False) 
+    results = get_store().search(
+        limit=10,
+        state=state,
+        district=district,
+        market=market,
+        commodity=commodity,
+        variety=variety,
+    )
+    return results.to_string(index=False) 
@@ -1,13 +1,98 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_core.tools import tool
-from dotenv import load_dotenv
 import os
-load_dotenv()
+import time
+import asyncio
+from collections import OrderedDict
+import httpx
+from langchain_core.tools import tool
+from Utils.metrics import increment, observe
 
 TAVILY_API_KEY=os.getenv("TAVILY_API_KEY")
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+WEB_SEARCH_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "3"))
+# Hard limit for one tool call, the interview moves on without results after it
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT_SECONDS", "8"))
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", "3600"))
+WEB_SEARCH_CACHE_MAX = int(os.getenv("WEB_SEARCH_CACHE_MAX", "1000"))
+
+_http_client: httpx.AsyncClient | None = None
+# normalized query -> (expires at, results), oldest first
+_cache: "OrderedDict[str, tuple[float, list]]" = OrderedDict()
+# normalized query -> upstream call in progress, shared by identical concurrent queries
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # One pooled client for every search instead of a session per call
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=WEB_SEARCH_TIMEOUT)
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+async def _tavily_search(query: str) -> list:
+    started = time.perf_counter()
+    try:
+        # Same request and result shape as langchain's TavilySearchResults
+        response = await get_http_client().post(TAVILY_SEARCH_URL, json={
+            "api_key": TAVILY_API_KEY,
+            "query": query,
+            "max_results": WEB_SEARCH_MAX_RESULTS,
+            "search_depth": "advanced",
+        })
+        response.raise_for_status()
+        return [
+            {"title": r["title"], "url": r["url"], "content": r["content"], "score": r["score"]}
+            for r in response.json().get("results", [])
+        ]
+    finally:
+        observe("web_search.upstream_s", time.perf_counter() - started)
+
+
+async def search(query: str) -> list:
+    """
+    Cached, coalesced Tavily search. Raises asyncio.TimeoutError after WEB_SEARCH_TIMEOUT.
+    """
+    key = normalize_query(query)
+    entry = _cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        _cache.move_to_end(key)
+        increment("web_search.hit")
+        return entry[1]
+
+    task = _inflight.get(key)
+    if task is None:
+        increment("web_search.miss")
+        task = asyncio.create_task(_tavily_search(query))
+        _inflight[key] = task
+
+        def store(done: asyncio.Task):
+            _inflight.pop(key, None)
+            if not done.cancelled() and done.exception() is None:
+                _cache[key] = (time.monotonic() + WEB_SEARCH_CACHE_TTL, done.result())
+                _cache.move_to_end(key)
+                while len(_cache) > WEB_SEARCH_CACHE_MAX:
+                    _cache.popitem(last=False)
+        task.add_done_callback(store)
+    else:
+        increment("web_search.coalesced")
+
+    # Shielded: a caller that times out or gets cancelled (barge-in) leaves the shared call running
+    return await asyncio.wait_for(asyncio.shield(task), WEB_SEARCH_TIMEOUT)
+
 
 @tool
-def web_search(query: str) -> dict | str:
+async def web_search(query: str) -> list | str:
     """
     Perform a web search using Tavily and return the top results.
     Use this tool when you don't have any information about the query.
@@ -17,7 +102,18 @@ def web_search(query: str) -> dict | str:
     Returns:
         str: The top search result.
     """
-    tavily_search = TavilySearchResults(max_results=3)
-    search_docs = tavily_search.invoke(query)
+    started = time.perf_counter()
+    try:
+        search_docs = await search(query)
+    except asyncio.TimeoutError:
+        increment("web_search.timeout")
+        print(f"DEBUG: ⏱️ Web search timed out: '{query}'")
+        return "The web search timed out."
+    except httpx.HTTPError as e:
+        increment("web_search.error")
+        print(f"DEBUG: ❌ Web search failed: {e}")
+        return "The web search failed."
+    finally:
+        observe("web_search.call_s", time.perf_counter() - started)
     # print("Web search results:", search_docs)
-    return search_docs if search_docs else "No results found."
\ No newline at end of file
+    return search_docs if search_docs else "No results found."
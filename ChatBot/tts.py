@@ -58,24 +58,49 @@
 #                 print(f"TTS ERROR: {e}")
 
 import os
+import asyncio
 from typing import AsyncIterator
-from google.cloud import texttospeech
 from ChatBot.events import VoiceAgentEvent
+from Utils.lazy import lazy_import
+from ChatBot.barge_in import BargeIn
+from ChatBot.clients import client_registry
+from ChatBot.latency import mark
+from ChatBot.tts_cache import tts_cache, cache_key
+from ChatBot.audio_formats import AudioOutput, AudioFormat, split_audio, playback_seconds
 
-async def tts_stream(event_stream: AsyncIterator[VoiceAgentEvent]) -> AsyncIterator[VoiceAgentEvent]:
+# Loaded on the first voice session, not at worker boot
+texttospeech = lazy_import("google.cloud.texttospeech")
+
+# Max sentences being synthesized at once. Audio is still sent in sentence order.
+TTS_MAX_INFLIGHT = int(os.getenv("TTS_MAX_INFLIGHT", "3"))
+
+async def tts_stream(
+    event_stream: AsyncIterator[VoiceAgentEvent],
+    barge_in: BargeIn | None = None,
+    output: AudioOutput | None = None,
+) -> AsyncIterator[VoiceAgentEvent]:
     """
     Google Cloud TTS Implementation (Streaming-Compatible)
+
+    Upstream events are read by a separate task so the agent keeps streaming
+    while earlier sentences are synthesized. Up to TTS_MAX_INFLIGHT requests
+    run concurrently; results are yielded in the order the sentences arrived.
+    Sentences of a turn interrupted via `barge_in` are dropped and their
+    synthesis cancelled. Each sentence uses the format `output` holds when it
+    is requested (PCM unless the client negotiated another, see audio_formats.py).
     """
+    barge_in = barge_in or BargeIn(enabled=False)
+    output = output or AudioOutput()
+
     # 1. Initialize Client
     try:
-        client = texttospeech.TextToSpeechAsyncClient()
+        # Shared, pre-warmed client instead of a new gRPC channel per session. Only checks it's
+        # available: synthesize() asks the registry every time, so a replaced client isn't reused
+        client = await client_registry.acquire("tts")
     except Exception as e:
         print(f"Google TTS Client Error: {e}")
         client = None
 
-    # Buffer settings: 8KB ~ 170ms of audio
-    MIN_CHUNK_SIZE = 8192 
-
     # 2. Configuration
     # Voice: 'Journey' voices are the most realistic (Pro tier quality)
     # available in: en-US-Journey-D, F, O, etc.
@@ -84,44 +109,119 @@ async def tts_stream(event_stream: AsyncIterator[VoiceAgentEvent]) -> AsyncItera
         name="en-US-Neural2-F" # 'F' is a female voice, 'D' is male
     )
 
-    # Audio Config: MATCHES YOUR FRONTEND (Raw PCM, 24kHz)
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.LINEAR16,
-        sample_rate_hertz=24000, 
-        speaking_rate=1.1 # 1.0 is normal, 1.1 is slightly faster
-    )
+    # Audio Config: encoding and rate follow the negotiated format (default raw PCM, 24kHz)
+    def audio_config_for(audio_format: AudioFormat) -> "texttospeech.AudioConfig":
+        return texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding[audio_format.encoding],
+            sample_rate_hertz=audio_format.sample_rate,
+            speaking_rate=1.1 # 1.0 is normal, 1.1 is slightly faster
+        )
+
+    semaphore = asyncio.Semaphore(TTS_MAX_INFLIGHT)
+    # (event, synthesis task or None, turn cancel token) in upstream order. None marks the end.
+    ordered = asyncio.Queue()
+    in_flight = set()
+
+    async def synthesize(text: str, audio_format: AudioFormat) -> tuple[AudioFormat, bytes]:
+        audio_config = audio_config_for(audio_format)
+        # Repeated interviewer phrases come from the cache without a network round trip
+        key = None
+        if tts_cache is not None:
+            key = cache_key(
+                text, voice_params.name, audio_config.speaking_rate,
+                audio_config.sample_rate_hertz, audio_config.audio_encoding.name,
+            )
+            if (cached := await tts_cache.get(key)) is not None:
+                mark("tts_response")
+                return audio_format, cached
+
+        async with semaphore:
+            # 3. Create Request (Remove markdown bold if present)
+            input_text = texttospeech.SynthesisInput(text=text.replace('**', ' ').replace("\n"," "))
+
+            # 4. Call API (Per sentence)
+            # Note: Google's standard API is extremely fast (~200ms). 
+            # We get the whole sentence audio at once.
+            mark("tts_request")
+            response = await (await client_registry.acquire("tts")).synthesize_speech(
+                input=input_text,
+                voice=voice_params,
+                audio_config=audio_config
+            )
+            mark("tts_response")
+        if key is not None:
+            await tts_cache.put(key, response.audio_content)
+        return audio_format, response.audio_content
+
+    async def read_upstream():
+        try:
+            async for event in event_stream:
+                task = None
+                cancelled = None
+                if event.type == "agent_chunk":
+                    cancelled = barge_in.cancelled
+                    barge_in.pending_sentences += 1
+                if client and event.type == "agent_chunk" and event.text and event.text.strip():
+                    # Start synthesis now, the slot keeps its place in line
+                    task = asyncio.create_task(synthesize(event.text, output.format))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                    if cancelled is not None:
+                        barge_in.register(cancelled, task)
+                await ordered.put((event, task, cancelled))
+        finally:
+            await ordered.put(None)
 
-    async for event in event_stream:
-        # Pass through upstream events
-        yield event
+    reader = asyncio.create_task(read_upstream())
 
-        # Process Agent Text (Sentences)
-        if client and event.type == "agent_chunk" and event.text and event.text.strip():
+    try:
+        while True:
+            item = await ordered.get()
+            if item is None:
+                break
+            event, task, cancelled = item
             try:
-                # print(f"DEBUG: 🗣️ Google TTS: '{event.text}'")
-                
-                # 3. Create Request
-                input_text = texttospeech.SynthesisInput(text=event.text.replace('**', ' ').replace("\n"," "))
-                
-                # 4. Call API (Per sentence)
-                # Note: Google's standard API is extremely fast (~200ms). 
-                # We get the whole sentence audio at once.
-                
-                response = await client.synthesize_speech(
-                    input=input_text,  # Remove markdown bold if present
-                    voice=voice_params,
-                    audio_config=audio_config
-                )
-                
-                # 5. Get Raw Bytes
-                raw_audio = response.audio_content
-                
+                # Candidate barged in: drop the rest of this reply
+                if cancelled is not None and cancelled.is_set():
+                    if task is not None:
+                        task.cancel()
+                    continue
+
+                # Pass through upstream events
+                yield event
+
+                if task is None:
+                    continue
+                await asyncio.wait({task})
+                if task.cancelled() or (cancelled is not None and cancelled.is_set()):
+                    continue
+                try:
+                    # 5. Get Raw Bytes
+                    audio_format, raw_audio = task.result()
+                except Exception as e:
+                    print(f"GOOGLE TTS ERROR: {e}")
+                    continue
+
                 # 6. Chunking Logic (To prevent flooding the frontend)
-                # Even though we got the full sentence, we feed it to the
+                # Even though we got the full sentence, PCM is fed to the
                 # frontend in bite-sized pieces to keep the buffer logic happy.
-                for i in range(0, len(raw_audio), MIN_CHUNK_SIZE):
-                    chunk = raw_audio[i : i + MIN_CHUNK_SIZE]
-                    yield VoiceAgentEvent(type="tts_chunk", audio=chunk)
-                
-            except Exception as e:
-                print(f"GOOGLE TTS ERROR: {e}")
\ No newline at end of file
+                # Compressed formats go out as one decodable file per sentence.
+                if cancelled is not None:
+                    # Its slot on the client's playback clock, so a barge-in knows what was heard
+                    barge_in.sentence_sent(cancelled, event.text, playback_seconds(audio_format, raw_audio))
+                for chunk in split_audio(audio_format, raw_audio):
+                    if cancelled is not None and cancelled.is_set():
+                        break
+                    yield VoiceAgentEvent(
+                        type="tts_chunk", audio=chunk, duration=playback_seconds(audio_format, chunk)
+                    )
+            finally:
+                if event.type == "agent_chunk":
+                    barge_in.pending_sentences -= 1
+
+        # Surface upstream errors to the caller like the old inline loop did
+        await reader
+    finally:
+        reader.cancel()
+        for task in list(in_flight):
+            task.cancel()
\ No newline at end of file
@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+from Utils.metrics import increment
+
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+# In-memory tier, LRU by total audio bytes (64 MiB ~ 20 min of 24 kHz LINEAR16)
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Long one-off sentences aren't worth a slot
+TTS_CACHE_MAX_ENTRY_BYTES = int(os.getenv("TTS_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+# Optional disk tier shared by workers on the same host; unset disables it
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR")
+# Cap for the whole directory. Every worker trims it after writing 1/TRIM_FRACTION of the cap,
+# so between trims it can run over by that much per worker
+TTS_CACHE_DISK_MAX_BYTES = int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+TRIM_FRACTION = 16
+# Temp files older than this are left over from a crashed write
+STALE_TMP_SECONDS = 300
+
+
+def normalize_text(text: str) -> str:
+    # Same cleanup the synthesis request gets, plus whitespace, so "  Hi **there**" and "Hi there" share audio
+    return " ".join(text.replace("**", " ").split())
+
+
+def cache_key(text: str, voice: str, speaking_rate: float, sample_rate: int, encoding: str) -> str:
+    material = f"{voice}|{speaking_rate}|{sample_rate}|{encoding}|{normalize_text(text)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Content-addressed synthesized audio: an in-memory LRU in front of an optional directory.
+
+    Keys come from cache_key(), so a voice or audio config change never serves
+    stale audio. Disk hits are promoted to memory.
+
+    The disk tier keeps no index: a lookup just opens the file, so clips written
+    or evicted by other workers are seen right away. Writes are atomic renames
+    and the directory is trimmed to its cap, oldest access first, by whichever
+    worker has written enough since its last trim.
+    """
+    def __init__(
+        self,
+        max_bytes: int = TTS_CACHE_MAX_BYTES,
+        max_entry_bytes: int = TTS_CACHE_MAX_ENTRY_BYTES,
+        directory: Optional[str] = TTS_CACHE_DIR,
+        disk_max_bytes: int = TTS_CACHE_DISK_MAX_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        # Bytes this worker wrote since its last trim. None until the first write,
+        # which trims (and creates the directory) instead of scanning it at import
+        self._written: Optional[int] = None
+        # Directory usage as of the last trim, for stats()
+        self._disk_entries: Optional[int] = None
+        self._disk_bytes: Optional[int] = None
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+            increment("tts_cache.hit_memory")
+        return audio
+
+    async def get(self, key: str) -> Optional[bytes]:
+        audio = self.get_memory(key)
+        if audio is not None:
+            return audio
+        if self.directory:
+            try:
+                audio = await asyncio.to_thread(self._read_file, key)
+            except OSError as e:
+                print(f"DEBUG: ⚠️ TTS cache read failed: {e}")
+                audio = None
+            if audio is not None:
+                increment("tts_cache.hit_disk")
+                self._put_memory(key, audio)
+                return audio
+        increment("tts_cache.miss")
+        return None
+
+    async def put(self, key: str, audio: bytes):
+        if not audio or len(audio) > self.max_entry_bytes:
+            return
+        self._put_memory(key, audio)
+        if not self.directory:
+            return
+        try:
+            if self._written is None:
+                await asyncio.to_thread(self._trim_disk)
+                self._written = 0
+            if await asyncio.to_thread(self._write_file, key, audio):
+                self._written += len(audio)
+            if self._written >= self.disk_max_bytes // TRIM_FRACTION:
+                await asyncio.to_thread(self._trim_disk)
+                self._written = 0
+        except OSError as e:
+            print(f"DEBUG: ⚠️ TTS cache write failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "memory_entries": len(self._entries),
+            "memory_bytes": self._bytes,
+            # Whole directory (all workers) at this worker's last trim
+            "disk_entries": self._disk_entries,
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def _put_memory(self, key: str, audio: bytes):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = audio
+        self._bytes += len(audio)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            increment("tts_cache.eviction_memory")
+
+    # --- Disk tier (blocking helpers, run in a thread) ---
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.audio")
+
+    def _trim_disk(self):
+        """
+        Delete the least recently used clips until the directory is under its cap.
+        Other workers may trim at the same time, a clip deleted twice is fine.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if entry.name.endswith(".tmp") and now - stat.st_mtime > STALE_TMP_SECONDS:
+                    os.remove(entry.path)
+                elif entry.name.endswith(".audio"):
+                    files.append((stat.st_mtime, entry.path, stat.st_size))
+            except FileNotFoundError:
+                continue
+        files.sort()
+        total = sum(size for _, _, size in files)
+        while files and total > self.disk_max_bytes:
+            _, path, size = files.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            increment("tts_cache.eviction_disk")
+        self._disk_entries, self._disk_bytes = len(files), total
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # mtime is the access time the trim goes by
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+        return audio
+
+    def _write_file(self, key: str, audio: bytes) -> bool:
+        if os.path.exists(self._path(key)):
+            return False
+        # Write then rename, so another worker never reads a half-written clip
+        tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, self._path(key))
+        return True
+
+
+tts_cache = TTSCache() if TTS_CACHE_ENABLED else None
@@ -0,0 +1,133 @@
+import os
+import math
+from array import array
+from collections import deque
+from typing import Callable, Optional
+from ChatBot.audio_formats import AudioInput
+from Utils.metrics import increment
+
+try:
+    from math import sumprod
+except ImportError:  # Python < 3.12
+    def sumprod(a, b):
+        return sum(x * y for x, y in zip(a, b))
+
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "20"))
+# Audio kept from before speech starts, so the first syllable isn't clipped
+VAD_PRE_ROLL_MS = int(os.getenv("VAD_PRE_ROLL_MS", "300"))
+# Silence after speech before the utterance counts as over (short pauses between words stay inside)
+VAD_HANG_OVER_MS = int(os.getenv("VAD_HANG_OVER_MS", "700"))
+# Consecutive loud frames needed to start, so a click or a key press doesn't open a stream
+VAD_START_MS = int(os.getenv("VAD_START_MS", "60"))
+# Frame RMS (int16 scale) is speech above max(VAD_MIN_RMS, noise floor * VAD_NOISE_RATIO)
+VAD_MIN_RMS = float(os.getenv("VAD_MIN_RMS", "300"))
+VAD_NOISE_RATIO = float(os.getenv("VAD_NOISE_RATIO", "3.0"))
+
+# Put on the STT queue when an utterance ends, the STT stage closes its recognize stream on it
+SPEECH_END = object()
+
+
+class VoiceActivityDetector:
+    """
+    Energy based VAD over mono 16-bit PCM.
+
+    Splits incoming audio into VAD_FRAME_MS frames and tracks the background
+    noise level while nobody talks. Returns the audio to forward: nothing
+    while silent, the pre-roll plus the frame when speech starts, every frame
+    while speaking (hang-over included), then SPEECH_END.
+    """
+    def __init__(self, sample_rate: int, on_event: Optional[Callable[[str], None]] = None):
+        self.frame_bytes = sample_rate * 2 * VAD_FRAME_MS // 1000
+        self.on_event = on_event
+        self.pending = bytearray()
+        self.pre_roll = deque(maxlen=max(1, VAD_PRE_ROLL_MS // VAD_FRAME_MS))
+        self.hang_over_frames = max(1, VAD_HANG_OVER_MS // VAD_FRAME_MS)
+        self.start_frames = max(1, VAD_START_MS // VAD_FRAME_MS)
+        self.noise_floor = VAD_MIN_RMS / VAD_NOISE_RATIO
+        self.speaking = False
+        self.loud_run = 0
+        self.quiet_run = 0
+
+    def rms(self, frame: bytes) -> float:
+        samples = array("h", frame)
+        return math.sqrt(sumprod(samples, samples) / len(samples))
+
+    def process(self, chunk: bytes) -> list:
+        self.pending += chunk
+        out = []
+        voiced = bytearray()
+        while len(self.pending) >= self.frame_bytes:
+            frame = bytes(self.pending[: self.frame_bytes])
+            del self.pending[: self.frame_bytes]
+            level = self.rms(frame)
+            loud = level >= max(VAD_MIN_RMS, self.noise_floor * VAD_NOISE_RATIO)
+
+            if not self.speaking:
+                self.pre_roll.append(frame)
+                self.loud_run = self.loud_run + 1 if loud else 0
+                if not loud:
+                    self.noise_floor = 0.95 * self.noise_floor + 0.05 * level
+                if self.loud_run >= self.start_frames:
+                    self.speaking = True
+                    self.quiet_run = 0
+                    voiced += b"".join(self.pre_roll)
+                    self.pre_roll.clear()
+                    increment("vad.utterances")
+                    self._emit("speech_start")
+                continue
+
+            voiced += frame
+            self.quiet_run = 0 if loud else self.quiet_run + 1
+            if self.quiet_run >= self.hang_over_frames:
+                self.speaking = False
+                self.loud_run = 0
+                out.append(bytes(voiced))
+                voiced.clear()
+                out.append(SPEECH_END)
+                self._emit("speech_end")
+
+        if voiced:
+            out.append(bytes(voiced))
+        increment("vad.bytes_in", len(chunk))
+        increment("vad.bytes_forwarded", sum(len(item) for item in out if item is not SPEECH_END))
+        return out
+
+    def _emit(self, kind: str):
+        if self.on_event is not None:
+            self.on_event(kind)
+
+
+class VadGate:
+    """
+    Sits between the socket's audio queue and stt_stream with the same get()
+    interface. Passes WebM/Opus through untouched; raw PCM (negotiated with
+    the config message) goes through a VoiceActivityDetector so silence never
+    reaches Google.
+    """
+    def __init__(self, queue, audio_input: AudioInput, on_event: Optional[Callable[[str], None]] = None):
+        self.queue = queue
+        self.audio_input = audio_input
+        self.on_event = on_event
+        self.vad: Optional[VoiceActivityDetector] = None
+        self.ready = deque()
+
+    def active(self) -> bool:
+        return VAD_ENABLED and self.audio_input.format.encoding == "LINEAR16"
+
+    async def get(self):
+        while not self.ready:
+            data = await self.queue.get()
+            if data is None or not self.active():
+                return data
+            if self.vad is None:
+                self.vad = VoiceActivityDetector(self.audio_input.format.sample_rate, self.on_event)
+            self.ready.extend(self.vad.process(data))
+        return self.ready.popleft()
+
+    # Used by the stop-and-wait STT loop to flush, which only runs for WebM input
+    def empty(self) -> bool:
+        return not self.ready and self.queue.empty()
+
+    def get_nowait(self):
+        return self.ready.popleft() if self.ready else self.queue.get_nowait()
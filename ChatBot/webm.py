@@ -0,0 +1,163 @@
+import os
+from collections import deque
+from typing import List, Optional
+
+# Longest replay on rotation. The new stream has to start at a Cluster, so when the
+# newest Cluster began longer ago than this the rotation waits for the next one
+STT_ROTATION_MAX_REPLAY = float(os.getenv("STT_ROTATION_MAX_REPLAY", "6"))
+# Give up looking for the first Cluster after this many header bytes
+MAX_HEADER_BYTES = 64 * 1024
+
+EBML_ID = b"\x1a\x45\xdf\xa3"
+SEGMENT_ID = b"\x18\x53\x80\x67"
+CLUSTER_ID = b"\x1f\x43\xb6\x75"
+TIMESTAMP_ID = 0xE7  # First child of every Cluster
+UNKNOWN_SIZE = -1
+
+
+def read_vint(data, pos: int) -> Optional[tuple]:
+    """
+    (value, length) of the EBML variable-size integer at `pos`, None if it isn't all there.
+    A size with every value bit set is UNKNOWN_SIZE (live MediaRecorder segments and clusters).
+    """
+    if pos >= len(data):
+        return None
+    first = data[pos]
+    if first == 0:
+        raise ValueError(f"Invalid EBML varint at {pos}")
+    length = 9 - first.bit_length()
+    if pos + length > len(data):
+        return None
+    value = first & (0xFF >> length)
+    for byte in data[pos + 1 : pos + length]:
+        value = (value << 8) | byte
+    if value == (1 << (7 * length)) - 1:
+        value = UNKNOWN_SIZE
+    return value, length
+
+
+def header_end(data) -> Optional[int]:
+    """
+    Offset of the first Cluster, i.e. the length of the EBML header plus the
+    Segment's metadata (Info, Tracks...). None until that much has arrived.
+    """
+    pos = 0
+    for expected in (EBML_ID, SEGMENT_ID):
+        if len(data) < pos + 4:
+            return None
+        if bytes(data[pos : pos + 4]) != expected:
+            raise ValueError("Not a WebM stream")
+        size = read_vint(data, pos + 4)
+        if size is None:
+            return None
+        pos += 4 + size[1]
+        if expected == EBML_ID:
+            pos += size[0]
+    # Children of the Segment up to the first Cluster
+    while True:
+        if len(data) < pos + 4:
+            return None
+        if bytes(data[pos : pos + 4]) == CLUSTER_ID:
+            return pos
+        element_id = read_vint(data, pos)
+        if element_id is None:
+            return None
+        size = read_vint(data, pos + element_id[1])
+        if size is None:
+            return None
+        if size[0] == UNKNOWN_SIZE:
+            raise ValueError("Unknown-size element before the first Cluster")
+        pos += element_id[1] + size[1] + size[0]
+
+
+def is_cluster_start(data, pos: int) -> bool:
+    # Cluster ID, a size, then its Timestamp: a Cluster ID inside Opus data is rarely followed by both
+    if bytes(data[pos : pos + 4]) != CLUSTER_ID:
+        return False
+    try:
+        size = read_vint(data, pos + 4)
+    except ValueError:
+        return False
+    if size is None:
+        return True  # Cut off at the end of the chunk, can't check further
+    after = pos + 4 + size[1]
+    return after >= len(data) or data[after] == TIMESTAMP_ID
+
+
+class WebmClusterTracker:
+    """
+    Follows a MediaRecorder WebM stream so a new recognize stream can be fed
+    valid WebM: the header (EBML + Segment metadata, without the first
+    Cluster's audio) followed by audio starting at a Cluster boundary.
+
+    header stays None until the first Cluster is found, and is set to False
+    if the stream can't be parsed; callers then fall back to replaying the
+    first chunk.
+    """
+    def __init__(self):
+        self.header = None
+        self._head = bytearray()
+        self.blocks = deque()  # [arrival time of the Cluster start, bytes from it on]
+        self._tail = b""
+
+    def feed(self, chunk: bytes, now: float):
+        if self.header is False:
+            return
+        if self.header is None:
+            self._head += chunk
+            try:
+                end = header_end(self._head)
+            except ValueError as e:
+                print(f"DEBUG: ⚠️ WebM header not parsed ({e}), replaying the first chunk on rotation")
+                self.header = False
+                return
+            if end is None:
+                if len(self._head) > MAX_HEADER_BYTES:
+                    self.header = False
+                return
+            self.header = bytes(self._head[:end])
+            chunk = bytes(self._head[end:])
+            self._head = None
+            self.blocks.append([now, bytearray()])
+
+        # Look for Cluster IDs, including one split across the previous chunk
+        data = self._tail + chunk
+        offset = len(self._tail)
+        cuts = []
+        found = data.find(CLUSTER_ID)
+        while found >= 0:
+            if is_cluster_start(data, found):
+                cuts.append(found)
+            found = data.find(CLUSTER_ID, found + 1)
+
+        position = offset
+        for cut in cuts:
+            block = self.blocks[-1][1]
+            if cut < offset:
+                # The ID began in the previous chunk: its first bytes move to the new block
+                del block[cut - offset :]
+            else:
+                block += data[position:cut]
+            if block:
+                self.blocks.append([now, bytearray()])
+            self.blocks[-1][1] += data[cut:offset]
+            position = max(cut, offset)
+        self.blocks[-1][1] += data[position:]
+        self._tail = bytes(data[-3:])
+
+        # Nothing older than the longest possible replay is needed
+        while len(self.blocks) > 1 and self.blocks[1][0] <= now - STT_ROTATION_MAX_REPLAY:
+            self.blocks.popleft()
+
+    def replay(self, now: float, overlap: float) -> Optional[List[bytes]]:
+        """
+        Audio from a Cluster start to now: the newest start at least `overlap`
+        seconds back, else the oldest one within STT_ROTATION_MAX_REPLAY.
+        None if no Cluster started within STT_ROTATION_MAX_REPLAY.
+        """
+        recent = [i for i, (started, _) in enumerate(self.blocks) if started >= now - STT_ROTATION_MAX_REPLAY]
+        if not recent:
+            return None
+        enough = [i for i in recent if self.blocks[i][0] <= now - overlap]
+        first = enough[-1] if enough else recent[0]
+        return [bytes(block) for _, block in list(self.blocks)[first:]]
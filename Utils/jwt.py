@@ -1,7 +1,5 @@
 import jwt
-from dotenv import load_dotenv
 import os
-load_dotenv()
 from datetime import datetime, timedelta, timezone
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
@@ -14,9 +12,12 @@ def create_jwt_token(username: str):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_jwt_token(token: str):
+    payload = decode_jwt_token(token)
+    return payload.get("sub") if payload else None
+
+def decode_jwt_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.PyJWTError:
         return None
 
@@ -0,0 +1,23 @@
+import sys
+import importlib.util
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Module that is only executed on first attribute access.
+
+    For heavy SDKs that a worker doesn't need until the first voice session
+    (Google Speech/TTS pull in gRPC and protobuf). Annotations that mention
+    the module must be strings, or they load it at import time. The first
+    access isn't thread-safe, make it from the event loop (see server.preload).
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,57 @@
+from collections import deque, defaultdict
+from typing import Dict
+
+# Samples kept per histogram, percentiles are computed over this window
+HISTOGRAM_WINDOW = 2048
+
+
+class Histogram:
+    """
+    Rolling window of observations. Recording is an O(1) append,
+    percentiles are only computed when /metrics is scraped.
+    """
+    def __init__(self, window: int = HISTOGRAM_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": 0}
+
+        def percentile(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 6)
+
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 6),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": round(ordered[-1], 6),
+        }
+
+
+histograms: Dict[str, Histogram] = defaultdict(Histogram)
+counters: Dict[str, int] = defaultdict(int)
+
+
+def observe(name: str, value: float):
+    histograms[name].observe(value)
+
+
+def increment(name: str, amount: int = 1):
+    counters[name] += amount
+
+
+def snapshot() -> dict:
+    return {
+        "histograms": {name: hist.summary() for name, hist in sorted(histograms.items())},
+        "counters": dict(sorted(counters.items())),
+    }
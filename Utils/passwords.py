@@ -0,0 +1,52 @@
+import os
+import time
+import asyncio
+import bcrypt
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from Utils.metrics import increment, observe
+
+# bcrypt releases the GIL, so a couple of threads keep hashing off the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Hashes queued or running before new logins get a 503 instead of waiting
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+# Cost factor for new hashes; existing hashes below it are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+
+
+async def _run(operation: str, fn, *args):
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        increment("auth.bcrypt_rejected")
+        print(f"DEBUG: ⚠️ Password hashing overloaded ({_pending} pending), rejecting {operation}")
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+    _pending += 1
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _pending -= 1
+        observe(f"auth.bcrypt_{operation}_s", time.perf_counter() - started)
+
+
+async def hash_password(password: str) -> str:
+    hashed = await _run("hash", lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)))
+    return hashed.decode('utf-8')
+
+
+async def check_password(password: str, password_hash: str) -> bool:
+    return await _run("check", bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """
+    True when the hash was made with a lower cost than BCRYPT_ROUNDS ("$2b$<cost>$...").
+    """
+    try:
+        return int(password_hash.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
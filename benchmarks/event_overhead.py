@@ -0,0 +1,92 @@
+"""
+Per-event cost of the voice pipeline's internal objects.
+
+Compares the slotted VoiceAgentEvent with the pydantic model it replaced, and
+memoryview audio slicing with copying bytes slices, for the hops every session
+makes (interim transcripts, agent sentences, TTS chunks):
+
+    python -m benchmarks.event_overhead
+    python -m benchmarks.event_overhead --number 200000
+"""
+import sys
+import json
+import timeit
+import argparse
+import tracemalloc
+from typing import Optional
+
+from pydantic import BaseModel
+
+from ChatBot.events import VoiceAgentEvent
+from ChatBot.audio_formats import AUDIO_FORMATS, split_audio
+
+
+class PydanticVoiceAgentEvent(BaseModel):
+    """The previous ChatBot/events.py model, kept here as the baseline."""
+    type: Optional[str] = None
+    text: Optional[str] = None
+    audio: Optional[bytes] = None
+    duration: Optional[float] = None
+    transcript: Optional[str] = None
+    is_final: Optional[bool] = False
+    confidence: Optional[float] = 0.0
+
+
+def copy_slices(audio: bytes, size: int):
+    for i in range(0, len(audio), size):
+        yield audio[i : i + size]
+
+
+def per_call_ns(statement, number: int) -> float:
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9
+
+
+def bytes_per_object(factory, count: int = 10000) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del objects
+    return allocated / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100000, help="Iterations per measurement")
+    parser.add_argument("--audio-bytes", type=int, default=48000, help="One synthesized sentence (1 s of LINEAR16 @ 24 kHz)")
+    args = parser.parse_args()
+
+    audio = b"\x00" * args.audio_bytes
+    pcm = AUDIO_FORMATS["pcm"]
+    chunk = audio[: pcm.chunk_bytes]
+    events = {
+        "stt_output": dict(type="stt_output", text="I would use a hash map", is_final=False, confidence=0.9),
+        "agent_chunk": dict(type="agent_chunk", text="Thanks, that is a reasonable approach."),
+        "tts_chunk": dict(type="tts_chunk", audio=chunk, duration=0.17),
+    }
+
+    report = {"event_create_ns": {}, "event_bytes": {}}
+    for name, fields in events.items():
+        report["event_create_ns"][name] = {
+            "slotted": round(per_call_ns(lambda: VoiceAgentEvent(**fields), args.number), 1),
+            "pydantic": round(per_call_ns(lambda: PydanticVoiceAgentEvent(**fields), args.number), 1),
+        }
+    report["event_bytes"] = {
+        "slotted": round(bytes_per_object(lambda: VoiceAgentEvent(**events["agent_chunk"])), 1),
+        "pydantic": round(bytes_per_object(lambda: PydanticVoiceAgentEvent(**events["agent_chunk"])), 1),
+    }
+
+    # Slicing one sentence into socket messages, per sentence
+    sentence_number = max(1, args.number // 100)
+    report["split_sentence_us"] = {
+        "memoryview": round(per_call_ns(lambda: sum(map(len, split_audio(pcm, audio))), sentence_number) / 1000, 2),
+        "bytes_copy": round(per_call_ns(lambda: sum(map(len, copy_slices(audio, pcm.chunk_bytes))), sentence_number) / 1000, 2),
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
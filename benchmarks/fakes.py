@@ -0,0 +1,168 @@
+"""
+Local stand-ins for Google STT, Groq and Google TTS used by the benchmarks.
+
+`install_fakes` patches them into the real modules, so the request path
+through routes/websocketStream.py and routes/chat.py is unchanged.
+"""
+import time
+import asyncio
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from unittest import mock
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langgraph.checkpoint.memory import MemorySaver
+
+from ChatBot.clients import client_registry
+from ChatBot.events import VoiceAgentEvent
+from ChatBot.tts_cache import TTSCache
+
+DEFAULT_REPLY = (
+    "Thanks, that is a reasonable approach. "
+    "How would you handle the case where the input does not fit in memory? "
+    "Take your time and walk me through the trade-offs."
+)
+
+
+@dataclass
+class BenchConfig:
+    # Candidate side (scripted STT)
+    utterance: str = "I would use a hash map to count the frequencies and then sort the keys"
+    speech_seconds: float = 2.0        # How long each utterance takes to say
+    silence_seconds: float = 3.0       # Gap after each utterance while the agent answers
+    frame_ms: int = 100                # Audio frame the client sends
+    frame_bytes: int = 1600            # Bytes per frame (Opus @ ~128 kbit/s)
+    interim_every_ms: int = 300        # Interim transcript cadence while speaking
+    final_delay_ms: int = 250          # STT endpointing delay after speech ends
+    # Agent side (fake LLM)
+    reply: str = DEFAULT_REPLY
+    first_token_ms: int = 300
+    token_ms: int = 15
+    # TTS side
+    tts_ms: int = 200
+    tts_bytes: int = 48000             # 1 s of LINEAR16 @ 24 kHz
+    tts_cache: bool = False            # Off by default so every sentence pays the TTS latency
+    turns: int = 3
+
+    @property
+    def frames_per_turn(self) -> int:
+        return int((self.speech_seconds + self.silence_seconds) * 1000 / self.frame_ms)
+
+    @property
+    def speech_frames(self) -> int:
+        return int(self.speech_seconds * 1000 / self.frame_ms)
+
+
+class FakeStreamingLLM(BaseChatModel):
+    """Streams a fixed reply word by word with configurable latency."""
+    reply: str = DEFAULT_REPLY
+    first_token_ms: int = 300
+    token_ms: int = 15
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _tokens(self) -> List[str]:
+        words = self.reply.split(" ")
+        return [w + " " for w in words[:-1]] + words[-1:]
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep((self.first_token_ms + self.token_ms * len(self._tokens())) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _stream(
+        self, messages: List[BaseMessage], stop=None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_ms / 1000)
+        for token in self._tokens():
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(self.token_ms / 1000)
+
+    async def _astream(
+        self, messages: List[BaseMessage], stop=None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for token in self._tokens():
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self.token_ms / 1000)
+
+
+class FakeTTSClient:
+    """Drop-in for TextToSpeechAsyncClient returning fixed-size PCM."""
+    def __init__(self, config: BenchConfig):
+        self.config = config
+
+    async def synthesize_speech(self, input, voice, audio_config, **kwargs):
+        await asyncio.sleep(self.config.tts_ms / 1000)
+        return FakeSynthesisResponse(b"\x00" * self.config.tts_bytes)
+
+
+@dataclass
+class FakeSynthesisResponse:
+    audio_content: bytes = field(default=b"")
+
+
+def scripted_stt(config: BenchConfig):
+    """
+    Replacement for ChatBot.stt.stt_stream.
+
+    Counts audio frames as they arrive so timing follows the client: every
+    turn is `speech_frames` of speech (interim results while it lasts, a final
+    `final_delay_ms` after it ends) followed by silence.
+    """
+    async def stt_stream(audio_queue: asyncio.Queue, websocket, audio_input=None) -> AsyncIterator[VoiceAgentEvent]:
+        words = config.utterance.split()
+        interim_frames = max(1, config.interim_every_ms // config.frame_ms)
+        frame = 0
+        while True:
+            data = await audio_queue.get()
+            if data is None:
+                return
+            position = frame % config.frames_per_turn
+            frame += 1
+            if position == config.speech_frames - 1:
+                await asyncio.sleep(config.final_delay_ms / 1000)
+                yield VoiceAgentEvent(type="stt_output", text=config.utterance, is_final=True, confidence=0.95)
+            elif position < config.speech_frames and position % interim_frames == interim_frames - 1:
+                spoken = max(1, len(words) * (position + 1) // config.speech_frames)
+                yield VoiceAgentEvent(type="stt_output", text=" ".join(words[:spoken]), is_final=False)
+    return stt_stream
+
+
+@contextmanager
+def install_fakes(config: BenchConfig):
+    """Patch the live backends with the fakes for the duration of the block."""
+    llm = FakeStreamingLLM(reply=config.reply, first_token_ms=config.first_token_ms, token_ms=config.token_ms)
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch("ChatBot.agent.llm", llm))
+        stack.enter_context(mock.patch("ChatBot.agent.summary_llm", llm))
+        stack.enter_context(mock.patch("ChatBot.agent.get_checkpointer", lambda mongodb_client=None: MemorySaver()))
+        stack.enter_context(mock.patch("routes.websocketStream.stt_stream", scripted_stt(config)))
+        stack.enter_context(mock.patch.dict(client_registry.clients, {"tts": FakeTTSClient(config)}))
+        stack.enter_context(mock.patch("ChatBot.tts.tts_cache", TTSCache(directory=None) if config.tts_cache else None))
+        # No Mongo in the harness: conversation catalog and transcript writes become no-ops
+        for target in (
+            "routes.chat.add_or_update_conversation",
+            "routes.websocketStream.add_or_update_conversation",
+            "routes.websocketStream.conversation_exists",
+            "ChatBot.invoke_agent.ensure_transcript",
+            "ChatBot.invoke_agent.append_transcript",
+        ):
+            stack.enter_context(mock.patch(target, mock.AsyncMock()))
+        yield
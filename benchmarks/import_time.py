@@ -0,0 +1,82 @@
+"""
+Cold-start import profile of the API worker.
+
+Runs `python -X importtime -c "import server"` in a fresh interpreter, prints
+the slowest modules and fails when a module that must stay lazy was imported
+at boot, or when the total is over --budget-ms:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --top 30 --budget-ms 1500
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+# Loaded on first use (see Utils/lazy.py, ChatBot/llm.py, ChatBot/tools/csv_tool.py)
+MUST_STAY_LAZY = [
+    "pandas",
+    "numpy",
+    "langchain_groq",
+    "langchain_google_genai",
+    "langchain_community",
+    "google.cloud.speech",
+    "google.cloud.texttospeech",
+]
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile(module: str = "server") -> tuple[list[tuple[str, int, int]], set[str]]:
+    """
+    (module, self µs, cumulative µs) for every import in import order, and the
+    names left in sys.modules afterwards.
+    """
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "import-profile")
+    code = f"import sys, {module}; print('\\n'.join(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    imports = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            imports.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return imports, set(result.stdout.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    imports, loaded = profile(args.module)
+    total_ms = next((cumulative for name, _, cumulative in imports if name == args.module), 0) / 1000
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(imports, key=lambda i: i[2], reverse=True)[: args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    print(f"\nimport {args.module}: {total_ms:.0f} ms, {len(imports)} modules")
+
+    failed = False
+    # A LazyLoader module sits in sys.modules before it runs, so check what actually executed
+    executed = {name for name, _, _ in imports} & loaded
+    eager = [name for name in MUST_STAY_LAZY if name in executed]
+    if eager:
+        print(f"FAIL: imported at boot: {', '.join(eager)}")
+        failed = True
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
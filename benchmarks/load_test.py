@@ -0,0 +1,191 @@
+"""
+Offline load test for the /socket/ voice pipeline and /chat/message.
+
+Runs the real routers under uvicorn with the fakes from benchmarks/fakes.py
+and drives concurrent clients against them:
+
+    python -m benchmarks.load_test --sessions 50 --turns 3
+    python -m benchmarks.load_test --sessions 0 --chat-requests 200 --chat-concurrency 20
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tracemalloc
+from contextlib import asynccontextmanager, redirect_stdout
+
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+import httpx
+import uvicorn
+import websockets
+from fastapi import FastAPI, Request, WebSocket
+
+from benchmarks.fakes import BenchConfig, install_fakes
+from ChatBot.agent import get_agent
+from mongodb.schema.userSchema import UserInDB
+from routes.chat import router as chat_router
+from routes.dependencies.check_login import check_login, check_socket_login
+from routes.websocketStream import router as websocket_router
+from Utils.metrics import Histogram, snapshot
+
+
+def build_app() -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.agent = get_agent()
+        app.database = None  # Mongo helpers are patched out by install_fakes
+        yield
+
+    async def bench_login(request: Request):
+        user = UserInDB(id="bench", username="bench", password_hash="")
+        request.state.user = user
+        return user
+
+    async def bench_socket_login(websocket: WebSocket):
+        return await bench_login(websocket)
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(chat_router)
+    app.include_router(websocket_router)
+    app.dependency_overrides[check_login] = bench_login
+    app.dependency_overrides[check_socket_login] = bench_socket_login
+    return app
+
+
+async def voice_session(url: str, config: BenchConfig, latencies: Histogram, totals: dict):
+    """One candidate: streams paced audio frames and timestamps the agent's audio."""
+    speech_end = []
+    first_audio = {}
+
+    async with websockets.connect(url, max_size=None) as ws:
+        async def receive():
+            async for message in ws:
+                if isinstance(message, bytes):
+                    totals["audio_bytes"] += len(message)
+                    turn = len(speech_end) - 1
+                    if turn >= 0 and turn not in first_audio:
+                        first_audio[turn] = time.perf_counter()
+
+        receiver = asyncio.create_task(receive())
+        frame = b"\x00" * config.frame_bytes
+        start = time.perf_counter()
+        for i in range(config.turns * config.frames_per_turn):
+            # Pace against the wall clock so sleep drift doesn't accumulate
+            await asyncio.sleep(max(0.0, start + i * config.frame_ms / 1000 - time.perf_counter()))
+            await ws.send(frame)
+            if i % config.frames_per_turn == config.speech_frames - 1:
+                speech_end.append(time.perf_counter())
+        await ws.close()
+        await asyncio.gather(receiver, return_exceptions=True)
+
+    for turn, ended in enumerate(speech_end):
+        if turn in first_audio:
+            latencies.observe(first_audio[turn] - ended)
+            totals["turns"] += 1
+        else:
+            totals["missed_turns"] += 1
+
+
+async def chat_load(base_url: str, requests: int, concurrency: int, latencies: Histogram):
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def one(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/chat/message", json={"message": "Hello", "conversation_id": f"bench-{i}"})
+                response.raise_for_status()
+                latencies.observe(time.perf_counter() - started)
+        await asyncio.gather(*(one(i) for i in range(requests)))
+
+
+async def run(args) -> dict:
+    config = BenchConfig(
+        turns=args.turns,
+        first_token_ms=args.llm_first_token_ms,
+        token_ms=args.llm_token_ms,
+        tts_ms=args.tts_ms,
+        tts_bytes=args.tts_bytes,
+        tts_cache=args.tts_cache,
+    )
+    report = {}
+    with install_fakes(config):
+        server = uvicorn.Server(uvicorn.Config(build_app(), host="127.0.0.1", port=0, log_level="warning"))
+        serve = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        if args.memory:
+            tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0] if args.memory else 0
+
+        if args.sessions:
+            latencies = Histogram()
+            totals = {"turns": 0, "missed_turns": 0, "audio_bytes": 0}
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                voice_session(f"ws://127.0.0.1:{port}/socket/", config, latencies, totals)
+                for _ in range(args.sessions)
+            ))
+            elapsed = time.perf_counter() - started
+            report["voice"] = {
+                "sessions": args.sessions,
+                "elapsed_s": round(elapsed, 3),
+                "turns_per_s": round(totals["turns"] / elapsed, 3),
+                "audio_mbit_per_s": round(totals["audio_bytes"] * 8 / elapsed / 1e6, 3),
+                "missed_turns": totals["missed_turns"],
+                "end_of_speech_to_first_audio_s": latencies.summary(),
+            }
+
+        if args.chat_requests:
+            latencies = Histogram()
+            started = time.perf_counter()
+            await chat_load(f"http://127.0.0.1:{port}", args.chat_requests, args.chat_concurrency, latencies)
+            elapsed = time.perf_counter() - started
+            report["chat"] = {
+                "requests": args.chat_requests,
+                "requests_per_s": round(args.chat_requests / elapsed, 3),
+                "latency_s": latencies.summary(),
+            }
+
+        if args.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            clients = max(1, args.sessions or args.chat_concurrency)
+            report["memory"] = {"peak_kib_per_session": round((peak - baseline) / clients / 1024, 1)}
+
+        report["server_metrics"] = snapshot()["histograms"]
+        server.should_exit = True
+        await serve
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent voice WebSocket sessions")
+    parser.add_argument("--turns", type=int, default=3, help="candidate utterances per session")
+    parser.add_argument("--chat-requests", type=int, default=0, help="total /chat/message requests")
+    parser.add_argument("--chat-concurrency", type=int, default=10)
+    parser.add_argument("--llm-first-token-ms", type=int, default=300)
+    parser.add_argument("--llm-token-ms", type=int, default=15)
+    parser.add_argument("--tts-ms", type=int, default=200)
+    parser.add_argument("--tts-bytes", type=int, default=48000)
+    parser.add_argument("--tts-cache", action="store_true", help="serve repeated sentences from ChatBot/tts_cache.py")
+    parser.add_argument("--memory", action="store_true", help="trace allocations (slower) to report memory per session")
+    parser.add_argument("--verbose", action="store_true", help="keep the server's DEBUG prints")
+    args = parser.parse_args()
+
+    if args.verbose:
+        report = asyncio.run(run(args))
+    else:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            report = asyncio.run(run(args))
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
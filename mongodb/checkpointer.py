@@ -0,0 +1,101 @@
+import asyncio
+import os
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.mongodb import MongoDBSaver
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.write_concern import WriteConcern
+
+# "async" shares the Motor pool from server.py's lifespan, "sync" is the old blocking MongoClient saver
+CHECKPOINTER_MODE = os.getenv("CHECKPOINTER_MODE", "async")
+CHECKPOINT_DB_NAME = os.getenv("CHECKPOINT_DB_NAME", "checkpointing_db")
+CHECKPOINT_COLLECTION = "checkpoints"
+CHECKPOINT_WRITES_COLLECTION = "checkpoint_writes"
+# Checkpoints and writes expire this long after they were written, so abandoned
+# threads disappear while active ones keep renewing their newest checkpoint. 0 disables.
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(30 * 24 * 3600))) or None
+
+
+def get_mongo_client_options() -> dict:
+    """
+    Pool settings shared by every Mongo client the app creates.
+    """
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+    }
+
+
+def get_checkpoint_write_concern() -> WriteConcern:
+    """
+    Write concern for checkpoint writes, e.g. CHECKPOINT_WRITE_CONCERN=majority or 1.
+    """
+    w = os.getenv("CHECKPOINT_WRITE_CONCERN", "1")
+    journal = os.getenv("CHECKPOINT_WRITE_JOURNAL")
+    wtimeout = os.getenv("CHECKPOINT_WRITE_TIMEOUT_MS")
+    return WriteConcern(
+        w=int(w) if w.isdigit() else w,
+        j=journal.lower() == "true" if journal else None,
+        wtimeout=int(wtimeout) if wtimeout else None,
+    )
+
+
+class MotorMongoDBSaver(AsyncMongoDBSaver):
+    """
+    AsyncMongoDBSaver running on the app's AsyncIOMotorClient.
+
+    The upstream constructor only accepts pymongo's AsyncMongoClient (it calls
+    client.append_metadata, which Motor resolves to a database), so the fields
+    are set up here instead. Documents are the same as MongoDBSaver writes, so
+    existing threads keep loading.
+    """
+    def __init__(
+        self,
+        client: AsyncIOMotorClient,
+        db_name: str = CHECKPOINT_DB_NAME,
+        checkpoint_collection_name: str = CHECKPOINT_COLLECTION,
+        writes_collection_name: str = CHECKPOINT_WRITES_COLLECTION,
+        ttl: int | None = None,
+        write_concern: WriteConcern | None = None,
+    ):
+        BaseCheckpointSaver.__init__(self)
+        self.client = client
+        self.db = client.get_database(db_name, write_concern=write_concern)
+        self.checkpoint_collection = self.db[checkpoint_collection_name]
+        self.writes_collection = self.db[writes_collection_name]
+        self._setup_future: asyncio.Future | None = None
+        self.loop = asyncio.get_running_loop()
+        self.ttl = ttl
+        self.touched_threads = set()
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        # Remembered for the compaction job in mongodb/retention.py
+        self.touched_threads.add(config["configurable"]["thread_id"])
+        return await super().aput(config, checkpoint, metadata, new_versions)
+
+    def take_touched_threads(self) -> set:
+        touched, self.touched_threads = self.touched_threads, set()
+        return touched
+
+
+def get_checkpointer(mongodb_client: AsyncIOMotorClient | None = None) -> BaseCheckpointSaver:
+    """
+    Build the LangGraph checkpointer. Must be called from inside the running loop in async mode.
+    """
+    if CHECKPOINTER_MODE == "async" and mongodb_client is not None:
+        print(f"INFO: Using async Motor checkpointer ({CHECKPOINT_DB_NAME})")
+        return MotorMongoDBSaver(
+            mongodb_client, ttl=CHECKPOINT_TTL_SECONDS, write_concern=get_checkpoint_write_concern()
+        )
+
+    print(f"INFO: Using sync MongoDB checkpointer ({CHECKPOINT_DB_NAME})")
+    client = MongoClient(os.getenv("MONGODB_URL"), **get_mongo_client_options())
+    return MongoDBSaver(
+        client,
+        db_name=CHECKPOINT_DB_NAME,
+        checkpoint_collection_name=CHECKPOINT_COLLECTION,
+        writes_collection_name=CHECKPOINT_WRITES_COLLECTION,
+        ttl=CHECKPOINT_TTL_SECONDS,
+    )
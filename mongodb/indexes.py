@@ -0,0 +1,82 @@
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
+from mongodb.checkpointer import (
+    CHECKPOINT_DB_NAME, CHECKPOINT_COLLECTION, CHECKPOINT_WRITES_COLLECTION, CHECKPOINT_TTL_SECONDS
+)
+from mongodb.userConversations import CONVERSATIONS_COLLECTION
+from mongodb.transcripts import TRANSCRIPTS_COLLECTION
+
+APP_DB_NAME = "users"
+# Set to false where indexes are managed by migrations/DBA instead of at boot
+ENSURE_INDEXES = os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() == "true"
+
+# (database, collection, keys, options) for every index a query in the codebase relies on
+REQUIRED_INDEXES = [
+    # get_user_by_username / create_user; unique closes the check-then-insert race
+    (APP_DB_NAME, "users", [("username", 1)], {"unique": True}),
+    # add_or_update_conversation upserts on (username, conversation_id)
+    (APP_DB_NAME, CONVERSATIONS_COLLECTION, [("username", 1), ("conversation_id", 1)], {"unique": True}),
+    # get_user_conversations pages on (updated_at, _id) within a user
+    (APP_DB_NAME, CONVERSATIONS_COLLECTION, [("username", 1), ("updated_at", -1), ("_id", -1)], {}),
+    # get_transcript_page pages on _id within a thread
+    (APP_DB_NAME, TRANSCRIPTS_COLLECTION, [("thread_id", 1), ("_id", -1)], {}),
+    # Same keys (and default names) as langgraph's MongoDBSaver setup, so nothing is duplicated
+    (CHECKPOINT_DB_NAME, CHECKPOINT_COLLECTION,
+     [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)], {"unique": True}),
+    (CHECKPOINT_DB_NAME, CHECKPOINT_WRITES_COLLECTION,
+     [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1), ("task_id", 1), ("idx", 1)], {"unique": True}),
+]
+if CHECKPOINT_TTL_SECONDS:
+    # Changing CHECKPOINT_TTL_SECONDS later needs a collMod (or drop), create_index reports the conflict
+    REQUIRED_INDEXES += [
+        (CHECKPOINT_DB_NAME, collection, [("created_at", 1)], {"expireAfterSeconds": CHECKPOINT_TTL_SECONDS})
+        for collection in (CHECKPOINT_COLLECTION, CHECKPOINT_WRITES_COLLECTION)
+    ]
+
+
+def index_name(keys) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+async def ensure_indexes(client: AsyncIOMotorClient) -> dict:
+    """
+    Create the required indexes and report the ones that failed or look unused.
+
+    create_index is a no-op when the index already exists, so this is safe on
+    every boot. A failure (e.g. duplicate usernames blocking a unique index) is
+    reported, not raised, so the server still starts.
+    """
+    report = {"created_or_present": [], "missing": [], "unused": []}
+    if not ENSURE_INDEXES:
+        print("INFO: Skipping Mongo index management (MONGODB_ENSURE_INDEXES=false)")
+        return report
+
+    # 1. Required indexes
+    expected = {}
+    for db_name, collection, keys, options in REQUIRED_INDEXES:
+        name = index_name(keys)
+        expected.setdefault((db_name, collection), set()).add(name)
+        try:
+            await client[db_name][collection].create_index(keys, **options)
+            report["created_or_present"].append(f"{db_name}.{collection}.{name}")
+        except OperationFailure as e:
+            report["missing"].append(f"{db_name}.{collection}.{name}")
+            print(f"DEBUG: ❌ Could not create index {db_name}.{collection}.{name}: {e}")
+
+    # 2. Indexes nobody asked for that have not been used since the last restart
+    for (db_name, collection), names in expected.items():
+        try:
+            stats = await client[db_name][collection].aggregate([{"$indexStats": {}}]).to_list(None)
+        except OperationFailure as e:
+            print(f"DEBUG: ⚠️ $indexStats unavailable for {db_name}.{collection}: {e}")
+            continue
+        for stat in stats:
+            if stat["name"] == "_id_" or stat["name"] in names:
+                continue
+            if stat.get("accesses", {}).get("ops", 0) == 0:
+                report["unused"].append(f"{db_name}.{collection}.{stat['name']}")
+
+    print(f"INFO: 🗂️ Mongo indexes: {len(report['created_or_present'])} ok, "
+          f"missing={report['missing']}, unused={report['unused']}")
+    return report
@@ -0,0 +1,108 @@
+import os
+import time
+import asyncio
+from typing import Iterable, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure, PyMongoError
+from mongodb.checkpointer import CHECKPOINT_DB_NAME, CHECKPOINT_COLLECTION, CHECKPOINT_WRITES_COLLECTION
+from Utils.metrics import increment, observe
+
+# Checkpoints kept per (thread, namespace); the newest one is all the agent ever loads
+CHECKPOINT_KEEP_LATEST = max(1, int(os.getenv("CHECKPOINT_KEEP_LATEST", "2")))
+# 0 disables the background job
+COMPACTION_INTERVAL = float(os.getenv("CHECKPOINT_COMPACTION_INTERVAL_SECONDS", "600"))
+# Sweep every thread on the first run (picks up history written before compaction existed)
+COMPACTION_FULL_SWEEP = os.getenv("CHECKPOINT_COMPACTION_FULL_SWEEP", "true").lower() == "true"
+
+
+async def _bson_bytes(collection, query: dict) -> int:
+    try:
+        result = await collection.aggregate([
+            {"$match": query},
+            {"$group": {"_id": None, "bytes": {"$sum": {"$bsonSize": "$$ROOT"}}}},
+        ]).to_list(1)
+    except OperationFailure:
+        return 0  # $bsonSize needs MongoDB 4.4+
+    return result[0]["bytes"] if result else 0
+
+
+async def compact_checkpoints(client: AsyncIOMotorClient, thread_ids: Optional[Iterable[str]] = None) -> dict:
+    """
+    Delete all but the newest CHECKPOINT_KEEP_LATEST checkpoints (and their writes)
+    of the given threads, or of every thread when thread_ids is None.
+    """
+    db = client[CHECKPOINT_DB_NAME]
+    checkpoints = db[CHECKPOINT_COLLECTION]
+    writes = db[CHECKPOINT_WRITES_COLLECTION]
+    stats = {"threads": 0, "checkpoints": 0, "writes": 0, "bytes": 0}
+    started = time.perf_counter()
+
+    # 1. (thread, namespace) pairs holding more than the kept checkpoints
+    pipeline = []
+    if thread_ids is not None:
+        thread_ids = list(thread_ids)
+        if not thread_ids:
+            return stats
+        pipeline.append({"$match": {"thread_id": {"$in": thread_ids}}})
+    pipeline += [
+        {"$group": {"_id": {"thread_id": "$thread_id", "checkpoint_ns": "$checkpoint_ns"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": CHECKPOINT_KEEP_LATEST}}},
+    ]
+    groups = await checkpoints.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+    # 2. Everything older than the kept ones; the unique index serves this sort
+    for group in groups:
+        scope = {"thread_id": group["_id"]["thread_id"], "checkpoint_ns": group["_id"]["checkpoint_ns"]}
+        stale = [
+            doc["checkpoint_id"]
+            async for doc in checkpoints.find(scope, {"checkpoint_id": 1})
+            .sort("checkpoint_id", -1)
+            .skip(CHECKPOINT_KEEP_LATEST)
+        ]
+        if not stale:
+            continue
+        query = {**scope, "checkpoint_id": {"$in": stale}}
+        stats["bytes"] += await _bson_bytes(checkpoints, query) + await _bson_bytes(writes, query)
+        stats["checkpoints"] += (await checkpoints.delete_many(query)).deleted_count
+        stats["writes"] += (await writes.delete_many(query)).deleted_count
+        stats["threads"] += 1
+
+    increment("checkpoint.compaction.checkpoints_deleted", stats["checkpoints"])
+    increment("checkpoint.compaction.writes_deleted", stats["writes"])
+    increment("checkpoint.compaction.bytes_reclaimed", stats["bytes"])
+    observe("checkpoint.compaction.run_s", time.perf_counter() - started)
+    if stats["checkpoints"]:
+        print(f"INFO: 🧹 Compacted {stats['threads']} threads: -{stats['checkpoints']} checkpoints, "
+              f"-{stats['writes']} writes, ~{stats['bytes'] / 1024:.1f} KiB reclaimed")
+    return stats
+
+
+async def run_compaction_loop(client: AsyncIOMotorClient, checkpointer):
+    """
+    Background task: compact the threads the saver touched since the last run.
+
+    The sync MongoDBSaver doesn't track touched threads, so in that mode every
+    run is a full sweep.
+    """
+    if COMPACTION_INTERVAL <= 0:
+        return
+    full = COMPACTION_FULL_SWEEP
+    while True:
+        try:
+            if full or not hasattr(checkpointer, "take_touched_threads"):
+                if hasattr(checkpointer, "take_touched_threads"):
+                    checkpointer.take_touched_threads()
+                await compact_checkpoints(client)
+                full = False
+            else:
+                await compact_checkpoints(client, checkpointer.take_touched_threads())
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            print(f"DEBUG: ❌ Checkpoint compaction failed: {e}")
+        except Exception as e:
+            # Anything else (bad document, bug) must not end compaction for the worker's lifetime.
+            # The touched threads were already taken, so sweep everything next time
+            print(f"DEBUG: ❌ Checkpoint compaction failed: {type(e).__name__}: {e}")
+            full = True
+        await asyncio.sleep(COMPACTION_INTERVAL)
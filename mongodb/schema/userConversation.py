@@ -1,10 +1,15 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
-class Conversation(BaseModel):
-    username: str
-    conversation_ids: List[str]
-    last_conversation_id: str
+class ConversationSummary(BaseModel):
+    conversation_id: str
+    title: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+class ConversationPage(BaseModel):
+    conversations: List[ConversationSummary]
+    next_cursor: Optional[str] = None
 class UserChat(BaseModel):
     message: str
-    conversation_id: str
\ No newline at end of file
+    conversation_id: str
@@ -0,0 +1,180 @@
+import os
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+from Utils.metrics import increment
+
+# Display messages only, one document each: {thread_id, type, text, created_at}
+TRANSCRIPTS_COLLECTION = "transcripts"
+# One document per thread: {state: "pending" | "done", claimed_at}. "done" once its checkpoint
+# history has been backfilled; markers from before the state field count as done
+TRANSCRIPT_THREADS_COLLECTION = "transcript_threads"
+# A "pending" claim older than this belongs to a worker that died mid-backfill and is taken over
+TRANSCRIPT_BACKFILL_LEASE = timedelta(seconds=float(os.getenv("TRANSCRIPT_BACKFILL_LEASE_SECONDS", "30")))
+TRANSCRIPT_WRITE_RETRIES = int(os.getenv("TRANSCRIPT_WRITE_RETRIES", "3"))
+TRANSCRIPT_PAGE_SIZE = int(os.getenv("TRANSCRIPT_PAGE_SIZE", "50"))
+TRANSCRIPT_MAX_PAGE_SIZE = 200
+
+# Threads known to be materialized, so the marker lookup happens once per thread per process
+_materialized = set()
+_MATERIALIZED_MAX = 10000
+
+
+def display_messages(messages: List[BaseMessage]) -> List[dict]:
+    """
+    The human questions and the AI message that ends each turn; tool calls and results are skipped.
+    """
+    entries = []
+    for index, curr in enumerate(messages):
+        if isinstance(curr, HumanMessage):
+            entries.append({"type": "human", "text": curr.content})
+        elif isinstance(curr, AIMessage) and (index == len(messages) - 1 or isinstance(messages[index + 1], HumanMessage)):
+            entries.append({"type": "ai", "text": curr.content})
+    return entries
+
+
+async def ensure_transcript(database: AsyncIOMotorDatabase, agent, config: dict):
+    """
+    Backfill a thread's transcript from its checkpoint the first time it is seen.
+
+    Threads written before transcripts existed only live in the checkpoint;
+    this reads that state once, and every later read and write skips it.
+    The marker is claimed as "pending" and only set to "done" after the
+    backfill is written, so a failed backfill is retried by the next caller.
+    Writers wait for "done" before appending, which keeps live turns after
+    the backfilled history.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    if thread_id in _materialized:
+        return
+    threads = database[TRANSCRIPT_THREADS_COLLECTION]
+    while True:
+        now = datetime.now(timezone.utc)
+        marker = await threads.find_one_and_update(
+            {"_id": thread_id},
+            {"$setOnInsert": {"state": "pending", "claimed_at": now, "created_at": now}},
+            upsert=True, return_document=ReturnDocument.BEFORE,
+        )
+        if marker is not None and marker.get("state", "done") == "done":
+            break
+        if marker is None:
+            await _backfill(database, agent, config)
+            break
+        # Someone else is backfilling; take over if their claim went stale
+        taken = await threads.update_one(
+            {"_id": thread_id, "state": "pending", "claimed_at": {"$lt": now - TRANSCRIPT_BACKFILL_LEASE}},
+            {"$set": {"claimed_at": now}},
+        )
+        if taken.modified_count:
+            await _backfill(database, agent, config)
+            break
+        await asyncio.sleep(0.2)
+
+    if len(_materialized) >= _MATERIALIZED_MAX:
+        _materialized.clear()
+    _materialized.add(thread_id)
+
+
+async def _backfill(database: AsyncIOMotorDatabase, agent, config: dict):
+    thread_id = config["configurable"]["thread_id"]
+    threads = database[TRANSCRIPT_THREADS_COLLECTION]
+    try:
+        state = await agent.aget_state(config)
+        messages = state.values.get("messages", []) if state else []
+        entries = [entry for entry in display_messages(messages) if entry["text"]]
+        # Idempotent: drop what an earlier, failed attempt managed to write
+        await database[TRANSCRIPTS_COLLECTION].delete_many({"thread_id": thread_id, "backfill": True})
+        if entries:
+            now = datetime.now(timezone.utc)
+            await database[TRANSCRIPTS_COLLECTION].insert_many(
+                [{"thread_id": thread_id, "type": e["type"], "text": e["text"], "created_at": now, "backfill": True} for e in entries],
+                ordered=True,
+            )
+            print(f"DEBUG: 🗒️ Backfilled {len(entries)} transcript entries for {thread_id}")
+        await threads.update_one({"_id": thread_id}, {"$set": {"state": "done"}})
+    except Exception:
+        # Release the claim so the next request retries instead of waiting out the lease
+        await threads.delete_one({"_id": thread_id, "state": "pending"})
+        raise
+
+
+async def append_transcript(database: AsyncIOMotorDatabase, thread_id: str, entries: List[dict]) -> List[ObjectId]:
+    """
+    Retried with backoff; ids are assigned up front, so a retry after a write that
+    actually landed finds duplicates instead of inserting the entries twice.
+    """
+    entries = [entry for entry in entries if entry["text"]]
+    if not entries:
+        return []
+    now = datetime.now(timezone.utc)
+    docs = [
+        {"_id": ObjectId(), "thread_id": thread_id, "type": entry["type"], "text": entry["text"], "created_at": now}
+        for entry in entries
+    ]
+    for attempt in range(TRANSCRIPT_WRITE_RETRIES):
+        try:
+            await database[TRANSCRIPTS_COLLECTION].insert_many(docs, ordered=False)
+            break
+        except BulkWriteError as e:
+            if all(error.get("code") == 11000 for error in e.details.get("writeErrors", [])):
+                break
+            error = e
+        except PyMongoError as e:
+            error = e
+        increment("transcript.write_retry")
+        print(f"DEBUG: ⚠️ Transcript write failed for {thread_id} (attempt {attempt + 1}): {error}")
+        if attempt + 1 == TRANSCRIPT_WRITE_RETRIES:
+            raise error
+        await asyncio.sleep(0.2 * 2 ** attempt)
+    return [doc["_id"] for doc in docs]
+
+
+async def replace_transcript_text(database: AsyncIOMotorDatabase, entry_id: ObjectId, text: str):
+    """
+    Rewrite an entry in place (a reply cut short by barge-in), removing it if nothing is left.
+    """
+    if text:
+        await database[TRANSCRIPTS_COLLECTION].update_one({"_id": entry_id}, {"$set": {"text": text}})
+    else:
+        await database[TRANSCRIPTS_COLLECTION].delete_one({"_id": entry_id})
+
+
+async def get_transcript_page(
+    database: AsyncIOMotorDatabase, agent, config: dict,
+    limit: int = TRANSCRIPT_PAGE_SIZE, before: str | None = None,
+) -> dict:
+    """
+    The newest `limit` entries older than `before`, returned oldest first.
+
+    Pass the returned next_before to load the previous page when scrolling up.
+    """
+    await ensure_transcript(database, agent, config)
+    limit = max(1, min(limit, TRANSCRIPT_MAX_PAGE_SIZE))
+    query = {"thread_id": config["configurable"]["thread_id"]}
+    if before:
+        try:
+            query["_id"] = {"$lt": ObjectId(before)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid 'before' id")
+
+    docs = await (
+        database[TRANSCRIPTS_COLLECTION]
+        .find(query, {"type": 1, "text": 1})
+        .sort("_id", -1)
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    docs.reverse()
+    return {
+        "history": [{"id": str(doc["_id"]), "type": doc["type"], "text": doc["text"]} for doc in docs],
+        "next_before": str(docs[0]["_id"]) if has_more else None,
+    }
@@ -1,27 +1,134 @@
-from fastapi import Request
-from mongodb.schema.userConversation import Conversation
+import os
+import base64
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import Request, HTTPException
+from pymongo import UpdateOne
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from mongodb.schema.userConversation import ConversationSummary, ConversationPage
 
-async def add_or_update_conversation(request: Request, username: str, conversation_id: str):
+# One document per conversation: {username, conversation_id, title, created_at, updated_at}
+CONVERSATIONS_COLLECTION = "conversations"
+# Old format: one document per user with an unbounded conversation_ids array
+LEGACY_COLLECTION = "userConversation"
+TITLE_MAX_CHARS = int(os.getenv("CONVERSATION_TITLE_MAX_CHARS", "80"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+HISTORY_MAX_PAGE_SIZE = 100
+
+SUMMARY_PROJECTION = {"_id": 1, "conversation_id": 1, "title": 1, "created_at": 1, "updated_at": 1}
+
+
+async def add_or_update_conversation(request: Request, username: str, conversation_id: str, title: str | None = None):
     """
-    Add a conversation ID to the user's conversation list and set it as the last conversation.
+    Create the conversation if needed and bump its updated_at. The first question becomes the title.
     """
-    await request.app.database["userConversation"].update_one(
-        {"username": username},
-        {
-            "$addToSet": {"conversation_ids": conversation_id},
-            "$set": {"last_conversation_id": conversation_id}
-        },
-        upsert=True
+    now = datetime.now(timezone.utc)
+    if title is not None:
+        title = " ".join(title.split())[:TITLE_MAX_CHARS]
+    # One round trip: an update pipeline fills the title of a new conversation and of one
+    # created by /newConversation (title None), and leaves an existing title alone.
+    # $literal so a title starting with "$" isn't read as a field path
+    await request.app.database[CONVERSATIONS_COLLECTION].update_one(
+        {"username": username, "conversation_id": conversation_id},
+        [{"$set": {
+            "updated_at": now,
+            "created_at": {"$ifNull": ["$created_at", now]},
+            "title": {"$ifNull": ["$title", {"$literal": title}]},
+        }}],
+        upsert=True,
     )
 
-async def get_user_conversations(request: Request, username: str):
+
+async def conversation_exists(request: Request, username: str, conversation_id: str) -> bool:
+    return await request.app.database[CONVERSATIONS_COLLECTION].count_documents(
+        {"username": username, "conversation_id": conversation_id}, limit=1
+    ) > 0
+
+
+def encode_cursor(updated_at: datetime, doc_id: ObjectId) -> str:
+    millis = int(updated_at.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    return base64.urlsafe_b64encode(f"{millis}:{doc_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        millis, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc), ObjectId(doc_id)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def get_user_conversations(
+    request: Request, username: str, limit: int = HISTORY_PAGE_SIZE, cursor: str | None = None
+) -> ConversationPage:
     """
-    Retrieve the user's conversation IDs and last conversation ID.
+    One page of the user's conversations, most recently updated first.
+
+    Keyset pagination on (updated_at, _id) served by the username/updated_at
+    index, so every page costs the same no matter how deep it is.
     """
-    response = await request.app.database["userConversation"].find_one({"username": username})
-    print("Fetched conversations:", response)
-    return Conversation(
-        username=str(response["username"]),
-        conversation_ids=[str(x) for x in response["conversation_ids"]],  
-        last_conversation_id=str(response["last_conversation_id"])
-    )
\ No newline at end of file
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    query = {"username": username}
+    if cursor:
+        updated_at, doc_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$lt": doc_id}},
+        ]
+
+    docs = await (
+        request.app.database[CONVERSATIONS_COLLECTION]
+        .find(query, SUMMARY_PROJECTION)
+        .sort([("updated_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    return ConversationPage(
+        conversations=[ConversationSummary(**doc) for doc in docs],
+        next_cursor=encode_cursor(docs[-1]["updated_at"], docs[-1]["_id"]) if has_more else None,
+    )
+
+
+async def migrate_conversation_arrays(database: AsyncIOMotorDatabase) -> int:
+    """
+    Copy legacy userConversation arrays into per-conversation documents.
+
+    Idempotent: upserts never overwrite existing documents and each legacy
+    document is stamped with migrated_at, which is how it's skipped next
+    time. The legacy documents are kept so a rollback still has them.
+    Array order is preserved through updated_at, last_conversation_id newest.
+    """
+    migrated = 0
+    legacy = database[LEGACY_COLLECTION]
+    conversations = database[CONVERSATIONS_COLLECTION]
+    async for doc in legacy.find({"migrated_at": {"$exists": False}}):
+        now = datetime.now(timezone.utc)
+        ids = [str(x) for x in doc.get("conversation_ids", [])]
+        last = doc.get("last_conversation_id")
+        if last is not None and str(last) in ids:
+            ids.remove(str(last))
+            ids.append(str(last))
+
+        operations = [
+            UpdateOne(
+                {"username": doc["username"], "conversation_id": conversation_id},
+                {"$setOnInsert": {
+                    "title": None,
+                    "created_at": now - timedelta(milliseconds=len(ids) - i),
+                    "updated_at": now - timedelta(milliseconds=len(ids) - i),
+                }},
+                upsert=True,
+            )
+            for i, conversation_id in enumerate(ids)
+        ]
+        if operations:
+            await conversations.bulk_write(operations, ordered=False)
+        await legacy.update_one({"_id": doc["_id"]}, {"$set": {"migrated_at": now}})
+        migrated += 1
+
+    if migrated:
+        print(f"INFO: 🗃️ Migrated conversation lists of {migrated} users to '{CONVERSATIONS_COLLECTION}'")
+    return migrated
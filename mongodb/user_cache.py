@@ -0,0 +1,64 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from mongodb.schema.userSchema import UserInDB
+from Utils.metrics import increment
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+
+
+class UserCache:
+    """
+    In-process LRU of UserInDB keyed by (username, token expiry).
+
+    An entry lives for USER_CACHE_TTL seconds and never past the token's own
+    expiry. Each worker has its own cache, so anything that changes a user
+    document must call invalidate() (create_user and the login rehash do).
+    """
+    def __init__(self, max_size: int = USER_CACHE_MAX_SIZE, ttl: float = USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, UserInDB]]" = OrderedDict()
+        self._keys_by_user: Dict[str, Set[Tuple[str, int]]] = {}
+
+    def get(self, username: str, token_exp: int) -> Optional[UserInDB]:
+        key = (username, token_exp)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                self._remove(key)
+            increment("user_cache.miss")
+            return None
+        self._entries.move_to_end(key)
+        increment("user_cache.hit")
+        return entry[1]
+
+    def put(self, username: str, token_exp: int, user: UserInDB):
+        key = (username, token_exp)
+        self._entries[key] = (min(time.time() + self.ttl, token_exp), user)
+        self._entries.move_to_end(key)
+        self._keys_by_user.setdefault(username, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            increment("user_cache.eviction")
+
+    def invalidate(self, username: str):
+        for key in list(self._keys_by_user.get(username, ())):
+            self._remove(key)
+
+    def _remove(self, key: Tuple[str, int]):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+user_cache = UserCache()
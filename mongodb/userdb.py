@@ -1,6 +1,9 @@
-import bcrypt
+from bson import ObjectId
 from fastapi import Request, HTTPException
+from pymongo.errors import DuplicateKeyError
 from mongodb.schema.userSchema import UserCreate, UserInDB
+from mongodb.user_cache import user_cache
+from Utils.passwords import hash_password, check_password, needs_rehash
 
 async def create_user(request: Request, user: UserCreate) -> str:
     """
@@ -11,12 +14,17 @@ async def create_user(request: Request, user: UserCreate) -> str:
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt())
+    hashed_password = await hash_password(user.password)
     user_doc = {
         "username": user.username,
-        "password_hash": hashed_password.decode('utf-8')
+        "password_hash": hashed_password
     }
-    result = await request.app.database["users"].insert_one(user_doc)
+    try:
+        result = await request.app.database["users"].insert_one(user_doc)
+    except DuplicateKeyError:
+        # Lost the race with a concurrent register for the same name (unique index)
+        raise HTTPException(status_code=400, detail="Username already exists")
+    user_cache.invalidate(user.username)
     return str(result.inserted_id)
 
 async def get_user_by_username(request: Request, username: str) -> UserInDB | None:
@@ -32,11 +40,36 @@ async def get_user_by_username(request: Request, username: str) -> UserInDB | No
         )
     return None
 
+async def get_authenticated_user(request: Request, username: str, token_exp: int) -> UserInDB | None:
+    """
+    get_user_by_username behind the per-process user cache, for the per-request login check.
+    """
+    user = user_cache.get(username, token_exp)
+    if user is None:
+        user = await get_user_by_username(request, username)
+        if user is not None:
+            user_cache.put(username, token_exp, user)
+    return user
+
 async def verify_user_password(request: Request, username: str, password: str) -> bool:
     """
-    Verify a user's password.
+    Verify a user's password, upgrading the stored hash if it predates the current cost.
     """
     user = await get_user_by_username(request, username)
     if not user:
         return False
-    return bcrypt.checkpw(password.encode('utf-8'), user.password_hash.encode('utf-8'))
\ No newline at end of file
+    if not await check_password(password, user.password_hash):
+        return False
+
+    if needs_rehash(user.password_hash):
+        try:
+            new_hash = await hash_password(password)
+        except HTTPException:
+            # Overloaded: the login still succeeds, the upgrade waits for the next one
+            return True
+        await request.app.database["users"].update_one(
+            {"_id": ObjectId(user.id)}, {"$set": {"password_hash": new_hash}}
+        )
+        user_cache.invalidate(username)
+        print(f"DEBUG: 🔐 Rehashed password for {username}")
+    return True
\ No newline at end of file
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Request, Depends, Query
 import uuid
-from mongodb.userConversations import add_or_update_conversation, get_user_conversations
-from ChatBot.invoke_agent import invoke_agent, get_conversation_history
+from mongodb.userConversations import (
+    add_or_update_conversation, get_user_conversations, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
+)
+from fastapi.responses import StreamingResponse
+import json
+from ChatBot.invoke_agent import invoke_agent, stream_agent, get_conversation_history
 from mongodb.schema.userConversation import UserChat
+from mongodb.transcripts import TRANSCRIPT_PAGE_SIZE, TRANSCRIPT_MAX_PAGE_SIZE
 from routes.dependencies.check_login import check_login
 router = APIRouter(
     prefix="/chat",
@@ -18,19 +23,53 @@ async def new_conversation(request: Request):
     return {"conversation_id": conversation_id}
 
 @router.get("/history")
-async def conversation_history(request: Request) -> dict:
+async def conversation_history(
+    request: Request,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+) -> dict:
     user = request.state.user  # Set by CheckLoginMiddleware
-    conversations = await get_user_conversations(request, user.username)
-    if conversations:
-        return conversations.model_dump(by_alias=True)
+    page = await get_user_conversations(request, user.username, limit, cursor)
+    if page.conversations or cursor:
+        response = page.model_dump(mode="json")
+        # The pre-pagination shape, kept for existing clients (see README): ids of this page, oldest first
+        response["username"] = user.username
+        response["conversation_ids"] = [c.conversation_id for c in reversed(page.conversations)]
+        if not cursor and page.conversations:
+            response["last_conversation_id"] = page.conversations[0].conversation_id
+        return response
     return {"message": "No conversations found"}
 
 @router.post("/message")
 async def send_message(userQuery: UserChat ,request: Request):
     response = await invoke_agent(request, userQuery.message, userQuery.conversation_id)
+    await add_or_update_conversation(
+        request, request.state.user.username, userQuery.conversation_id, title=userQuery.message
+    )
     return {"message": response,"type":"ai"}
 
+@router.post("/message/stream")
+async def stream_message(userQuery: UserChat, request: Request):
+    """
+    /chat/message as server-sent events (token, tool_start, tool_end, message, error).
+    """
+    await add_or_update_conversation(
+        request, request.state.user.username, userQuery.conversation_id, title=userQuery.message
+    )
+    async def events():
+        async for event in stream_agent(request, userQuery.message, userQuery.conversation_id):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/conversation_history/{conversation_id}")
-async def get_chat_conversation_history(request: Request, conversation_id: str):
-    history = get_conversation_history(request, conversation_id)
-    return {"history": history}
\ No newline at end of file
+async def get_chat_conversation_history(
+    request: Request,
+    conversation_id: str,
+    limit: int = Query(TRANSCRIPT_PAGE_SIZE, ge=1, le=TRANSCRIPT_MAX_PAGE_SIZE),
+    before: str | None = None,
+):
+    return await get_conversation_history(request, conversation_id, limit, before)
\ No newline at end of file
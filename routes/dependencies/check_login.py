@@ -1,18 +1,29 @@
-from fastapi import Depends, HTTPException, Request
-from Utils.jwt import verify_jwt_token
-from mongodb.userdb import get_user_by_username
+from fastapi import Depends, HTTPException, Request, WebSocket, WebSocketException, status
+from Utils.jwt import decode_jwt_token
+from mongodb.userdb import get_authenticated_user
 
 async def check_login(request: Request):
     access_token = request.cookies.get("access_token")
     if not access_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    username = verify_jwt_token(access_token)
+    payload = decode_jwt_token(access_token)
+    username = payload.get("sub") if payload else None
     if not username:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-    user = await get_user_by_username(request, username)
+    user = await get_authenticated_user(request, username, payload["exp"])
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     request.state.user = user  # Attach user info to request.state
     return user
+
+async def check_socket_login(websocket: WebSocket):
+    """
+    check_login for the /socket/ handshake: same cookie, but a failure closes
+    the socket with 1008 instead of answering 401.
+    """
+    try:
+        return await check_login(websocket)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
@@ -1,36 +1,138 @@
+import os
+import time
 import asyncio
 import json
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from uuid import uuid4
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from typing import AsyncIterator
 from ChatBot.socket_manager import active_websocket
+from ChatBot.latency import TurnTracer, active_tracer, begin_turn, mark
 # Import your modules
 from ChatBot.stt import stt_stream
 from ChatBot.invoke_agent import agent_stream
 from ChatBot.tts import tts_stream
 from ChatBot.events import VoiceAgentEvent
+from ChatBot.barge_in import BargeIn
+from ChatBot.queues import BoundedQueue, BLOCK
+from ChatBot.audio_formats import AudioOutput, AudioInput
+from ChatBot.vad import VadGate
+from Utils.metrics import observe
+from mongodb.userConversations import add_or_update_conversation, conversation_exists
+from routes.dependencies.check_login import check_login, check_socket_login
+
+# Queue bounds, see ChatBot/queues.py for the policies
+AUDIO_QUEUE_LIMIT = int(os.getenv("AUDIO_QUEUE_LIMIT", "500"))
+AUDIO_QUEUE_POLICY = os.getenv("AUDIO_QUEUE_POLICY", "drop_oldest")
+EVENT_QUEUE_LIMIT = int(os.getenv("EVENT_QUEUE_LIMIT", "256"))
+EVENT_QUEUE_POLICY = os.getenv("EVENT_QUEUE_POLICY", "coalesce")
 
 router = APIRouter(prefix='/socket')
 
+# connection id -> {"user", "queues"} of every open socket. Each user sees their own sockets
+# on /socket/stats, /metrics only gets totals (queue_totals)
+active_connections = {}
+
+def audio_queue_policy(audio_input: AudioInput) -> str:
+    # Dropping WebM bytes corrupts the container (and could hit the header STT replays),
+    # so it blocks; whole raw PCM chunks can be dropped
+    return AUDIO_QUEUE_POLICY if audio_input.format.encoding == "LINEAR16" else BLOCK
+
+def is_interim_transcript(event: VoiceAgentEvent) -> bool:
+    return event is not None and event.type == "stt_output" and not event.is_final
+
+def coalesce_interims(last: VoiceAgentEvent, new: VoiceAgentEvent) -> bool:
+    # A newer interim transcript supersedes a queued one
+    return is_interim_transcript(last) and is_interim_transcript(new)
+
+@router.get("/stats")
+async def socket_stats(user=Depends(check_login)):
+    return {
+        connection_id: {name: queue.stats() for name, queue in connection["queues"].items()}
+        for connection_id, connection in active_connections.items()
+        if connection["user"] == user.username
+    }
+
+def queue_totals() -> dict:
+    """
+    Queue stats summed over all open sockets, without connection ids or users.
+    """
+    totals = {}
+    for connection in active_connections.values():
+        for name, queue in connection["queues"].items():
+            total = totals.setdefault(name, {"depth": 0, "received": 0, "dropped": 0, "coalesced": 0, "paused": 0})
+            stats = queue.stats()
+            for key in ("depth", "received", "dropped", "coalesced"):
+                total[key] += stats[key]
+            total["paused"] += int(stats["paused"])
+    return {"connections": len(active_connections), "queues": totals}
+
 @router.websocket("/")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None = None, user=Depends(check_socket_login)):
     print("INFO: Setting the websocket")
     active_websocket.set(websocket)
+    active_tracer.set(TurnTracer())
+
+    # Same thread key as /chat/message (conversation_id + username): reconnecting with the
+    # conversation id picks the interview up from its latest checkpoint, nothing is replayed
+    resumed = bool(conversation_id) and await conversation_exists(websocket, user.username, conversation_id)
+    conversation_id = conversation_id or str(uuid4())
+    await add_or_update_conversation(websocket, user.username, conversation_id)
+    websocket.state.conversation_id = conversation_id
+
     await websocket.accept()
-    print("INFO: WebSocket connection accepted")
+    await websocket.send_text(json.dumps({"type": "session", "conversation_id": conversation_id, "resumed": resumed}))
+    print(f"INFO: WebSocket connection accepted ({user.username}, conversation {conversation_id}, resumed={resumed})")
+
+    # Control messages sent from sync callbacks (queue pressure, VAD), referenced until
+    # sent and cancelled when the socket closes
+    pending_sends = set()
+    def sent(task: asyncio.Task):
+        pending_sends.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"DEBUG: ⚠️ Control message not sent: {task.exception()}")
+
+    def send_control(message: dict):
+        task = asyncio.create_task(websocket.send_text(json.dumps(message)))
+        pending_sends.add(task)
+        task.add_done_callback(sent)
+
+    def signal_audio_pressure(paused: bool):
+        send_control({"type": "pause_audio" if paused else "resume_audio"})
+
+    # Mic input format, from the config message (before the first frame). Raw PCM is VAD-gated
+    audio_input = AudioInput()
 
     # 1. Queue for RAW AUDIO (Bytes from Frontend)
-    audio_queue = asyncio.Queue()
+    audio_queue = BoundedQueue("audio", AUDIO_QUEUE_LIMIT, audio_queue_policy(audio_input), on_pressure=signal_audio_pressure)
     
     # 2. Queue for EVENTS (The "Bus" where STT and Config meet)
     # This acts as the central hub for data flow
-    event_queue = asyncio.Queue()
+    event_queue = BoundedQueue("events", EVENT_QUEUE_LIMIT, EVENT_QUEUE_POLICY, coalesce=coalesce_interims)
+
+    connection_id = str(uuid4())
+    active_connections[connection_id] = {"user": user.username, "queues": {"audio": audio_queue, "events": event_queue}}
 
     # Shared State
     state = {
         "listen_only": False,       # Default mode
-        "transcript_buffer": []     # Stores text while in Listen Mode
+        "transcript_buffer": [],    # Stores text while in Listen Mode
+        "speech_ended_at": None,    # Last VAD speech_end, for the end-of-utterance metric
+        "title_task": None,         # Titles the conversation with the first final transcript
     }
 
+    # Interruption state shared by STT (detects), agent and TTS (cancel)
+    barge_in = BargeIn()
+
+    # TTS output format, negotiated through the config message
+    audio_output = AudioOutput()
+
+    def signal_speech(kind: str):
+        # speech_start / speech_end, the client can use speech_end as an early end-of-utterance cue
+        if kind == "speech_end":
+            state["speech_ended_at"] = time.perf_counter()
+        send_control({"type": kind})
+    stt_input = VadGate(audio_queue, audio_input, on_event=signal_speech)
+
     # --- TASK A: Read from WebSocket (Audio + Config) ---
     # --- TASK A: Read from WebSocket ---
     # --- TASK A: Read from WebSocket ---
@@ -42,6 +144,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 if "bytes" in message:
                     data = message["bytes"]
                     if data and len(data) > 0:
+                        audio_input.started = True
                         await audio_queue.put(data)
 
                 elif "text" in message:
@@ -64,6 +167,22 @@ async def websocket_endpoint(websocket: WebSocket):
                             state["listen_only"] = new_mode
                             print(f"INFO: Mode set to: {'Listen Only' if new_mode else 'Interactive'}")
 
+                            if "barge_in" in data:
+                                barge_in.enabled = bool(data["barge_in"])
+                                print(f"INFO: Barge-in {'enabled' if barge_in.enabled else 'disabled'}")
+
+                            if "audio_format" in data:
+                                if not audio_output.select(data["audio_format"]):
+                                    print(f"DEBUG: ⚠️ Unsupported audio format '{data['audio_format']}', keeping {audio_output.format.name}")
+                                # Tell the client what it will actually get
+                                await websocket.send_text(json.dumps(audio_output.describe()))
+
+                            if "audio_input" in data:
+                                if not audio_input.select(data["audio_input"], data.get("sample_rate")):
+                                    print(f"DEBUG: ⚠️ Can't switch input to '{data['audio_input']}', keeping {audio_input.format.name}")
+                                audio_queue.policy = audio_queue_policy(audio_input)
+                                await websocket.send_text(json.dumps({**audio_input.describe(), "vad": stt_input.active()}))
+
                         # 2. Handle Code Submission
                         elif data.get("type") == "code_submission":
                             user_code = data.get("code", "")
@@ -92,7 +211,20 @@ async def websocket_endpoint(websocket: WebSocket):
     async def run_stt_process():
         try:
             # Pass the Queue DIRECTLY to stt_stream. 
-            async for event in stt_stream(audio_queue, websocket): 
+            async for event in stt_stream(stt_input, websocket, audio_input): 
+                # Candidate started talking over the agent: cut the reply and tell the UI to drop queued audio
+                if barge_in.should_interrupt(event):
+                    barge_in.interrupt()
+                    try:
+                        await websocket.send_text(json.dumps({"type": "stop_playback"}))
+                    except Exception:
+                        pass # Socket might be closed
+                # End of the candidate's utterance starts the latency clock for the turn
+                if event.is_final and not state["listen_only"]:
+                    begin_turn()
+                if event.is_final and state["speech_ended_at"] is not None:
+                    observe("vad.speech_end_to_final_s", time.perf_counter() - state["speech_ended_at"])
+                    state["speech_ended_at"] = None
                 await event_queue.put(event)
                 
         except asyncio.CancelledError:
@@ -123,12 +255,19 @@ async def websocket_endpoint(websocket: WebSocket):
                     state["transcript_buffer"] = [] # Clear
                     
                     # Send to Agent immediately
+                    begin_turn()
                     yield VoiceAgentEvent(type="stt_output", text=full_context, is_final=True)
                 continue
 
             # --- LOGIC 2: Echo User Transcript to Frontend ---
             # Always update the UI, even in Listen Mode
             if event.type == "stt_output" and event.is_final and event.text:
+                if state["title_task"] is None:
+                    # Like /chat/message: the first question titles the conversation (kept if it
+                    # already has one). A task, so the agent doesn't wait on the write
+                    state["title_task"] = asyncio.create_task(
+                        add_or_update_conversation(websocket, user.username, conversation_id, title=event.text)
+                    )
                 try:
                     await websocket.send_text(json.dumps({
                         "type": "user_transcript", 
@@ -162,14 +301,16 @@ async def websocket_endpoint(websocket: WebSocket):
             
             # 2. Connect Agent to TTS
             # agent_stream takes the stream first, then the websocket/request
-            agent_output = agent_stream(gate_stream, websocket)
+            agent_output = agent_stream(gate_stream, websocket, barge_in)
             
             # 3. Connect TTS to WebSocket Output
-            final_stream = tts_stream(agent_output)
+            final_stream = tts_stream(agent_output, barge_in, audio_output)
 
             async for event in final_stream:
                 if event.type == "tts_chunk":
                     await websocket.send_bytes(event.audio)
+                    mark("first_audio_byte")
+                    barge_in.audio_sent(event.duration or 0.0)
                 elif event.type == "agent_chunk":
                     # Stream Agent Text to UI
                     await websocket.send_text(event.text)
@@ -188,4 +329,14 @@ async def websocket_endpoint(websocket: WebSocket):
             run_response_pipeline()
         )
     except Exception:
-        pass
\ No newline at end of file
+        pass
+    finally:
+        for task in list(pending_sends):
+            task.cancel()
+        if state["title_task"] is not None:
+            # Let the title write finish rather than drop it with the socket
+            await asyncio.wait({state["title_task"]}, timeout=5)
+            if state["title_task"].done() and not state["title_task"].cancelled() and state["title_task"].exception():
+                print(f"DEBUG: ⚠️ Conversation title not saved: {state['title_task'].exception()}")
+        active_connections.pop(connection_id, None)
+        print(f"INFO: Queue stats for {connection_id}: audio={audio_queue.stats()} events={event_queue.stats()}")
\ No newline at end of file
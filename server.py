@@ -1,25 +1,60 @@
+# .env is loaded once, before any module reads its settings
+from dotenv import load_dotenv
+load_dotenv()
 from fastapi import FastAPI
 from routes.test import app as test_router
 from motor.motor_asyncio import AsyncIOMotorClient
 from contextlib import asynccontextmanager
-from dotenv import load_dotenv
 from routes.authentication import router as auth_router
-from ChatBot.llm import get_llm
 from ChatBot.agent import get_agent
-from langchain_core.messages import HumanMessage
 from routes.chat import router as chat_router
-from routes.websocketStream import router as websocket_router
-import requests
-import base64
+from routes.websocketStream import router as websocket_router, queue_totals
+from mongodb.checkpointer import get_mongo_client_options
+from mongodb.indexes import ensure_indexes
+from mongodb.userConversations import migrate_conversation_arrays
+from mongodb.retention import run_compaction_loop
+from ChatBot.tools.web_search_tool import close_http_client
+from Utils.metrics import snapshot
+from ChatBot.tts_cache import tts_cache
+from ChatBot.tools.csv_tool import get_store
+from ChatBot.clients import client_registry, speech, texttospeech
+import asyncio
+import time
 import os
-load_dotenv()
+
+async def preload():
+    """
+    Load what import no longer does (market data, Google Speech/TTS SDKs) and warm the
+    shared API clients once the worker is already serving, so the first voice session
+    doesn't pay for it.
+    """
+    started = time.perf_counter()
+    # Plain imports, safe in a thread
+    await asyncio.to_thread(get_store)
+    # LazyLoader modules run on first attribute access, and that isn't safe from another
+    # thread, so these run here on the loop, once, before any session needs them
+    speech.SpeechAsyncClient, texttospeech.TextToSpeechAsyncClient
+    print(f"INFO: Preloaded data and SDKs in {time.perf_counter() - started:.2f}s")
+    # Also loads the Google credentials, in a thread
+    await client_registry.warm()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.mongodb_client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    app.mongodb_client = AsyncIOMotorClient(os.getenv("MONGODB_URL"), **get_mongo_client_options())
     app.database = app.mongodb_client["users"]  
-    config = {"configurable": {"thread_id": "1"}}
-    app.agent = get_agent()
+    app.index_report = await ensure_indexes(app.mongodb_client)
+    if os.getenv("MIGRATE_CONVERSATIONS", "true").lower() == "true":
+        await migrate_conversation_arrays(app.database)
+    app.agent = get_agent(mongodb_client=app.mongodb_client)
+    compaction = asyncio.create_task(run_compaction_loop(app.mongodb_client, app.agent.checkpointer))
+    preloading = asyncio.create_task(preload())
+    health_checks = asyncio.create_task(client_registry.run_health_checks())
     yield
+    preloading.cancel()
+    health_checks.cancel()
+    compaction.cancel()
+    await close_http_client()
+    await client_registry.close()
     app.mongodb_client.close()
 
 app = FastAPI(lifespan=lifespan)
@@ -29,4 +64,13 @@ app.include_router(chat_router)
 app.include_router(websocket_router)
 @app.get("/")
 def default_route():
-    return {"message": "Hello, World!"}
\ No newline at end of file
+    return {"message": "Hello, World!"}
+
+@app.get("/metrics")
+def metrics():
+    report = snapshot()
+    if tts_cache is not None:
+        report["tts_cache"] = tts_cache.stats()
+    report["clients"] = client_registry.stats()
+    report["sockets"] = queue_totals()
+    return report
\ No newline at end of file
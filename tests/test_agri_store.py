@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ChatBot.tools import agri_store
+from ChatBot.tools.agri_store import AgriStore, SEARCH_COLUMNS
+
+
+def linear_scan(df: pd.DataFrame, limit: int = 10, **filters) -> pd.DataFrame:
+    """The search_data implementation AgriStore replaced."""
+    results = df.copy()
+    for column, value in filters.items():
+        if value:
+            results = results[results[column].str.lower() == value.lower()]
+    return results.head(limit)
+
+
+@pytest.fixture(scope="module")
+def frame() -> pd.DataFrame:
+    return pd.read_csv("agri_data.csv")
+
+
+@pytest.fixture(scope="module")
+def store() -> AgriStore:
+    return AgriStore.from_csv("agri_data.csv")
+
+
+def same_rows(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    return a.astype(str).reset_index(drop=True).equals(b.astype(str).reset_index(drop=True))
+
+
+def test_exact_filters_match_the_linear_scan(frame, store):
+    rng = random.Random(7)
+    for _ in range(300):
+        row = frame.iloc[rng.randrange(len(frame))]
+        columns = rng.sample(SEARCH_COLUMNS, rng.randint(1, 3))
+        # Mixed case, as the model passes it
+        filters = {column: rng.choice([str.lower, str.upper, str.title])(str(row[column])) for column in columns}
+        assert same_rows(store.search(limit=10, **filters), linear_scan(frame, 10, **filters)), filters
+
+
+def test_no_filters_returns_the_first_rows(frame, store):
+    assert same_rows(store.search(limit=5), frame.head(5))
+
+
+def test_conflicting_filters_return_nothing(store):
+    assert store.search(state="Andaman and Nicobar", district="no such district anywhere").empty
+
+
+def test_missing_values_never_match():
+    df = pd.DataFrame({column: ["a", None, "A"] for column in SEARCH_COLUMNS})
+    store = AgriStore(df)
+    assert list(store.search(state="a").index) == [0, 2]
+
+
+def test_prefix_and_fuzzy_fallbacks(store, monkeypatch):
+    monkeypatch.setattr(agri_store, "FUZZY_MATCH", True)
+    assert set(store.search(limit=100, market="port").market.astype(str).str.lower()) == {"port blair"}
+    assert not store.search(commodity="Tomatto").empty
+
+    monkeypatch.setattr(agri_store, "FUZZY_MATCH", False)
+    assert store.search(market="port").empty
+
+
+def test_index_positions_are_sorted(store):
+    for index in store.indexes.values():
+        for positions in index.values():
+            assert np.all(np.diff(positions) > 0)
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from ChatBot.queues import BoundedQueue, DROP_OLDEST, DROP_NEWEST, BLOCK, PAUSE, COALESCE
+
+
+def drain(queue: BoundedQueue) -> list:
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_drop_oldest_keeps_the_newest_items():
+    queue = BoundedQueue("test", 3, DROP_OLDEST)
+    for i in range(5):
+        queue.put_nowait(i)
+    assert drain(queue) == [2, 3, 4]
+    assert queue.stats()["dropped"] == 2
+
+
+def test_drop_newest_refuses_new_items():
+    queue = BoundedQueue("test", 3, DROP_NEWEST)
+    for i in range(5):
+        queue.put_nowait(i)
+    assert drain(queue) == [0, 1, 2]
+    assert queue.dropped == 2
+
+
+@pytest.mark.parametrize("policy", [DROP_OLDEST, DROP_NEWEST, PAUSE])
+def test_stop_sentinel_is_never_dropped(policy):
+    queue = BoundedQueue("test", 2, policy)
+    queue.put_nowait(1)
+    queue.put_nowait(2)
+    queue.put_nowait(None)
+    queue.put_nowait(3)
+    assert None in drain(queue)
+
+
+def test_block_waits_for_space():
+    async def run():
+        queue = BoundedQueue("test", 2, BLOCK)
+        await queue.put(1)
+        await queue.put(2)
+        put = asyncio.create_task(queue.put(3))
+        await asyncio.sleep(0.01)
+        assert not put.done()
+        assert queue.get_nowait() == 1
+        await asyncio.wait_for(put, 1)
+        return drain(queue), queue.dropped
+    assert asyncio.run(run()) == ([2, 3], 0)
+
+
+def test_pause_signals_pressure_and_resume():
+    signals = []
+    queue = BoundedQueue("test", 8, PAUSE, on_pressure=signals.append)
+    for i in range(6):
+        queue.put_nowait(i)
+    assert signals == [True]
+    while queue.qsize() > 2:
+        queue.get_nowait()
+    assert signals == [True, False]
+    assert not queue.paused
+
+
+def test_coalesce_replaces_the_last_item():
+    async def run():
+        queue = BoundedQueue("test", 2, COALESCE, coalesce=lambda last, new: last[0] == new[0] == "interim")
+        await queue.put(("final", "a"))
+        await queue.put(("interim", "b"))
+        await queue.put(("interim", "bc"))
+        return drain(queue), queue.coalesced
+    assert asyncio.run(run()) == ([("final", "a"), ("interim", "bc")], 1)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedQueue("test", 1, "spill")
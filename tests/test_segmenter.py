@@ -0,0 +1,90 @@
+import pytest
+
+from ChatBot.segmenter import SentenceSegmenter
+
+
+def segment(text: str, **options) -> list:
+    segmenter = SentenceSegmenter(**options)
+    segments = segmenter.feed(text)
+    rest = segmenter.flush()
+    return segments + ([rest] if rest else [])
+
+
+def test_sentences_wait_for_the_next_character():
+    segmenter = SentenceSegmenter(first_chunk_fast=False, min_chars=1)
+    assert segmenter.feed("Hello there.") == []
+    assert segmenter.feed(" Next") == ["Hello there."]
+    assert segmenter.flush() == "Next"
+
+
+def test_first_chunk_cuts_at_a_clause():
+    text = "That is a reasonable first approach, but what about memory? Tell me more."
+    assert segment(text, first_chunk_min_chars=25) == [
+        "That is a reasonable first approach,",
+        "but what about memory? Tell me more.",
+    ]
+
+
+def test_short_clause_is_not_a_first_chunk():
+    assert segment("Sure, that is a reasonable approach to take here. Next question.") == [
+        "Sure, that is a reasonable approach to take here.",
+        "Next question.",
+    ]
+
+
+def test_short_sentences_are_joined_after_the_first():
+    assert segment("Hi. Ok. Sounds good to me, then we will move on. Great.") == [
+        "Hi.",
+        "Ok. Sounds good to me, then we will move on.",
+        "Great.",
+    ]
+
+
+@pytest.mark.parametrize("text", [
+    "Use e.g. a heap here and it will be fine for all of us.",
+    "Ask J. Smith about it today please and get back to me.",
+    "1. Use a heap for it and keep going here for a while now.",
+    "Call `x.y()` now and look at what it returns to the caller.",
+])
+def test_dots_that_do_not_end_a_sentence(text):
+    assert segment(text + " Then go.", first_chunk_fast=False) == [text, "Then go."]
+
+
+def test_closing_quote_stays_with_its_sentence():
+    assert segment('He said "stop." Then left.', first_chunk_fast=False, min_chars=1) == ['He said "stop."', "Then left."]
+
+
+def test_long_run_is_cut_at_a_word_break():
+    segments = segment("word " * 60, first_chunk_fast=False, max_chars=50)
+    # At the first word break past the max
+    assert len(segments) > 1
+    assert all(len(s) <= 50 + len("word ") for s in segments)
+    assert " ".join(segments).split() == ["word"] * 60
+
+
+def test_paragraph_break_ends_a_segment():
+    assert segment("A heading without a stop\n\nThen the body follows.", first_chunk_fast=False, min_chars=1) == [
+        "A heading without a stop",
+        "Then the body follows.",
+    ]
+
+
+def test_token_by_token_matches_one_feed():
+    text = ("Great question, let's think about it. A hash map gives O(1) lookups, e.g. for caching. "
+            "However, the worst case matters too! What would you do about collisions? 2. Consider resizing.")
+    segmenter = SentenceSegmenter()
+    streamed = []
+    for i in range(0, len(text), 3):
+        streamed += segmenter.feed(text[i : i + 3])
+    rest = segmenter.flush()
+    assert streamed + ([rest] if rest else []) == segment(text)
+
+
+def test_reset_forgets_the_open_segment():
+    segmenter = SentenceSegmenter(first_chunk_fast=False, min_chars=1)
+    segmenter.feed("Half a sent")
+    segmenter.reset()
+    assert segmenter.feed("New reply. Go") == ["New reply."]
+    assert segmenter.first is False
+    assert segmenter.flush() == "Go"
+    assert segmenter.flush() is None
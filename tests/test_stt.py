@@ -0,0 +1,138 @@
+import time
+import asyncio
+from array import array
+
+import pytest
+
+from ChatBot import stt, vad
+from ChatBot.stt import strip_overlap
+from ChatBot.vad import VadGate
+from ChatBot.audio_formats import AudioInput, AUDIO_INPUT_FORMATS
+from ChatBot.webm import WebmClusterTracker, header_end, CLUSTER_ID
+
+
+@pytest.mark.parametrize("previous, current, expected", [
+    ("so I would use a hash map", "hash map and then iterate", "and then iterate"),
+    ("So I would use a Hash Map.", "hash map, and then iterate", "and then iterate"),
+    # Punctuation-only tokens count for neither matching nor the cut
+    ("use a map.", "— a map, then sort", "then sort"),
+    ("use a map", "a map — then sort", "— then sort"),
+    ("I don't know", "don't know yet", "yet"),
+    ("nothing in common", "completely new words", "completely new words"),
+    ("all of it", "all of it", ""),
+    ("", "fresh start", "fresh start"),
+])
+def test_strip_overlap(previous, current, expected):
+    assert strip_overlap(previous, current) == expected
+
+
+SAMPLE_RATE = 16000
+UNKNOWN = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def element(element_id: bytes, payload: bytes) -> bytes:
+    return element_id + bytes([0x80 | len(payload)]) + payload
+
+
+def cluster(n: int) -> bytes:
+    # Unknown size like MediaRecorder writes, Timestamp first, then SimpleBlocks
+    return CLUSTER_ID + UNKNOWN + b"\xe7\x81" + bytes([n]) + (b"\xa3\x86\x81\x00\x00\x80" + bytes([n, n])) * 20
+
+
+HEADER = (
+    element(b"\x1a\x45\xdf\xa3", b"\x42\x82\x84webm")
+    + b"\x18\x53\x80\x67" + UNKNOWN
+    + element(b"\x15\x49\xa9\x66", b"\x2a\xd7\xb1\x83\x0f\x42\x40")
+    + element(b"\x16\x54\xae\x6b", b"\xae" + b"\x00" * 30)
+)
+CLUSTERS = [cluster(n) for n in range(4)]
+STREAM = HEADER + b"".join(CLUSTERS)
+
+
+def test_header_ends_at_the_first_cluster():
+    assert header_end(STREAM) == len(HEADER)
+    assert header_end(STREAM[: len(HEADER) - 5]) is None
+    with pytest.raises(ValueError):
+        header_end(b"RIFF0000WAVE")
+
+
+@pytest.mark.parametrize("chunk_size", [5, 37, 100, len(STREAM)])
+def test_tracker_splits_chunks_at_clusters(chunk_size):
+    tracker = WebmClusterTracker()
+    for i in range(0, len(STREAM), chunk_size):
+        tracker.feed(STREAM[i : i + chunk_size], now=i / 1000)
+    assert tracker.header == HEADER
+    assert [bytes(block) for _, block in tracker.blocks] == CLUSTERS
+
+
+def test_replay_starts_at_a_cluster_within_the_window():
+    tracker = WebmClusterTracker()
+    tracker.feed(HEADER, now=0.0)
+    for n, started in enumerate([0.0, 2.0, 4.0, 5.5]):
+        tracker.feed(CLUSTERS[n], now=started)
+    # Newest cluster start at least 1.5 s back
+    assert tracker.replay(now=6.0, overlap=1.5) == CLUSTERS[2:]
+    # None that far back within the max replay: the oldest one that is
+    assert tracker.replay(now=7.0, overlap=5.5) == CLUSTERS[1:]
+    # Nothing started recently enough to begin a stream at
+    assert tracker.replay(now=100.0, overlap=1.5) is None
+
+
+def test_unparsable_stream_falls_back():
+    tracker = WebmClusterTracker()
+    tracker.feed(b"not webm at all", now=0.0)
+    assert tracker.header is False
+
+
+class RecordingStream:
+    """Stands in for RecognizeStream, records how each stream was opened."""
+    opened = []
+
+    def __init__(self, client, header, overlap, results, replayed, audio_format=AUDIO_INPUT_FORMATS["webm_opus"]):
+        self.header = header
+        self.audio_format = audio_format
+        self.results = results
+        self.replayed = replayed
+        self.had_final = False
+        self.started = time.monotonic()
+        self.sent = list(overlap)
+        self.task = asyncio.create_task(asyncio.sleep(0))
+        RecordingStream.opened.append(self)
+
+    async def send(self, chunk):
+        self.sent.append(chunk)
+
+    def close(self):
+        self.results.put_nowait(("closed", self, None))
+
+
+def test_pcm_selected_after_stt_stream_started(monkeypatch):
+    RecordingStream.opened = []
+    monkeypatch.setattr(stt, "RecognizeStream", RecordingStream)
+    monkeypatch.setattr(stt, "get_speech_client", lambda: asyncio.sleep(0, "client"))
+    frame = SAMPLE_RATE * 2 * vad.VAD_FRAME_MS // 1000
+    loud = array("h", [8000, -8000] * (frame // 4)).tobytes()
+
+    async def run():
+        queue = asyncio.Queue()
+        audio_input = AudioInput()
+        gate = VadGate(queue, audio_input)
+        consumer = asyncio.create_task(asyncio.wait_for(drain(stt.stt_stream(gate, None, audio_input)), 5))
+        await asyncio.sleep(0.01)
+        # The config message arrives after the STT stage is already waiting for audio
+        assert audio_input.select("pcm", SAMPLE_RATE)
+        audio_input.started = True
+        for chunk in [bytes(frame * 5), loud * 10, bytes(frame * 60), None]:
+            queue.put_nowait(chunk)
+        await consumer
+
+    asyncio.run(run())
+    assert len(RecordingStream.opened) == 1
+    opened = RecordingStream.opened[0]
+    assert opened.audio_format.encoding == "LINEAR16"
+    assert opened.audio_format.sample_rate == SAMPLE_RATE
+    assert opened.header is None
+
+
+async def drain(events):
+    return [event async for event in events]
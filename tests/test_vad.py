@@ -0,0 +1,106 @@
+import math
+import asyncio
+from array import array
+
+from ChatBot import vad
+from ChatBot.vad import VoiceActivityDetector, VadGate, SPEECH_END
+from ChatBot.audio_formats import AudioInput
+
+SAMPLE_RATE = 16000
+FRAME_BYTES = SAMPLE_RATE * 2 * vad.VAD_FRAME_MS // 1000
+
+
+def tone(frames: int, amplitude: int = 8000) -> bytes:
+    samples = FRAME_BYTES // 2 * frames
+    return array("h", (int(amplitude * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) for i in range(samples))).tobytes()
+
+
+def silence(frames: int) -> bytes:
+    return bytes(FRAME_BYTES * frames)
+
+
+def audio_bytes(out: list) -> int:
+    return sum(len(item) for item in out if item is not SPEECH_END)
+
+
+def test_silence_is_not_forwarded():
+    detector = VoiceActivityDetector(SAMPLE_RATE)
+    assert detector.process(silence(50)) == []
+    assert not detector.speaking
+
+
+def test_speech_starts_after_start_frames_with_pre_roll():
+    events = []
+    detector = VoiceActivityDetector(SAMPLE_RATE, events.append)
+    detector.process(silence(30))
+
+    # One frame short of the start threshold: still nothing
+    assert detector.process(tone(detector.start_frames - 1)) == []
+    out = detector.process(tone(1))
+    assert events == ["speech_start"]
+    # The pre-roll (silence before speech plus the loud run) comes out with the starting frame
+    assert audio_bytes(out) == FRAME_BYTES * detector.pre_roll.maxlen
+
+
+def test_click_shorter_than_start_frames_is_ignored():
+    detector = VoiceActivityDetector(SAMPLE_RATE)
+    for _ in range(5):
+        assert detector.process(tone(detector.start_frames - 1) + silence(5)) == []
+    assert not detector.speaking
+
+
+def test_hang_over_keeps_short_pauses_inside_the_utterance():
+    events = []
+    detector = VoiceActivityDetector(SAMPLE_RATE, events.append)
+    detector.process(tone(detector.start_frames))
+
+    out = detector.process(silence(detector.hang_over_frames - 1) + tone(5))
+    assert SPEECH_END not in out
+    assert audio_bytes(out) == FRAME_BYTES * (detector.hang_over_frames - 1 + 5)
+
+    out = detector.process(silence(detector.hang_over_frames))
+    assert out[-1] is SPEECH_END
+    assert audio_bytes(out) == FRAME_BYTES * detector.hang_over_frames
+    assert events == ["speech_start", "speech_end"]
+    assert not detector.speaking
+
+
+def test_partial_frames_are_buffered():
+    detector = VoiceActivityDetector(SAMPLE_RATE)
+    loud = tone(detector.start_frames)
+    out = []
+    for i in range(0, len(loud), 100):
+        out += detector.process(loud[i : i + 100])
+    assert detector.speaking
+    assert audio_bytes(out) == len(loud)
+
+
+def gate_output(audio_input: AudioInput, chunks: list) -> list:
+    async def run():
+        queue = asyncio.Queue()
+        for chunk in chunks + [None]:
+            queue.put_nowait(chunk)
+        gate = VadGate(queue, audio_input)
+        out = []
+        while (item := await gate.get()) is not None:
+            out.append(item)
+        return gate, out
+    return asyncio.run(run())
+
+
+def test_gate_passes_webm_through():
+    chunks = [b"\x1a\x45\xdf\xa3header", silence(10), b"opus"]
+    gate, out = gate_output(AudioInput(), chunks)
+    assert not gate.active()
+    assert out == chunks
+
+
+def test_gate_filters_pcm():
+    audio_input = AudioInput()
+    audio_input.select("pcm", SAMPLE_RATE)
+    start_frames = VoiceActivityDetector(SAMPLE_RATE).start_frames
+    gate, out = gate_output(audio_input, [silence(20), tone(start_frames + 5), silence(60)])
+    assert gate.active()
+    assert out[-1] is SPEECH_END
+    # The leading silence is dropped apart from the pre-roll
+    assert audio_bytes(out) < len(silence(20)) + len(tone(start_frames + 5)) + len(silence(60))